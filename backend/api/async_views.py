@@ -0,0 +1,143 @@
+import asyncio
+import contextvars
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import prefetch_related_objects
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, JsonResponse
+from rest_framework.exceptions import APIException
+
+from foodgram.models import recipe_prefetches
+from .serializers import GetRecipeSerializer, SubscriptionSerializer
+from .views import (CustomUserViewSet, IngredientViewSet, RecipeViewSet,
+                    TagViewSet)
+
+# В Django 3.2 нет асинхронного ORM: каждый запрос к базе выполняется в
+# отдельном пуле потоков, а цикл событий только параллелит независимые
+# запросы и не держит поток на время ожидания.
+db_executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_DB_WORKERS,
+    thread_name_prefix='async-db'
+)
+
+
+def call_in_thread(func, *args, **kwargs):
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run(func, *args, **kwargs):
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        db_executor, partial(context.run, call_in_thread, func,
+                             *args, **kwargs))
+
+
+def data_response(data):
+    return JsonResponse(data, safe=False,
+                        json_dumps_params={'ensure_ascii': False})
+
+
+def initial_view(fallback, request, **kwargs):
+    view = fallback.cls(**fallback.initkwargs)
+    view.action_map = fallback.actions
+    view.args, view.kwargs = (), kwargs
+    view.request = view.initialize_request(request, **kwargs)
+    view.headers = view.default_response_headers
+    view.initial(view.request, **kwargs)
+    return view
+
+
+def async_read(fallback):
+    def decorator(handler):
+        async def view(request, *args, **kwargs):
+            if request.method == 'GET':
+                try:
+                    return await handler(request, *args, **kwargs)
+                except (APIException, Http404, PermissionDenied):
+                    # Ошибку формирует синхронное представление, чтобы
+                    # ответы обоих путей совпадали.
+                    pass
+            return await sync_to_async(fallback)(request, *args, **kwargs)
+        view.csrf_exempt = True
+        view.fallback = fallback
+        return view
+    return decorator
+
+
+async def prefetch_recipes(recipes):
+    for recipe in recipes:
+        recipe.__dict__.setdefault('_prefetched_objects_cache', {})
+    await asyncio.gather(*(
+        run(prefetch_related_objects, recipes, lookup)
+        for lookup in recipe_prefetches()
+    ))
+
+
+async def represent_recipes(serializer, recipes):
+    await prefetch_recipes(await run(serializer.load_fragments, recipes))
+    return await run(lambda: [
+        serializer.to_representation(recipe) for recipe in recipes
+    ])
+
+
+@async_read(RecipeViewSet.as_view(
+    {'get': 'list', 'post': 'create'}, basename='recipe', detail=False))
+async def recipe_list(request):
+    view = await run(initial_view, recipe_list.fallback, request)
+    recipes = await run(lambda: view.paginate_queryset(
+        view.filter_queryset(view.get_queryset())))
+    serializer = GetRecipeSerializer(context=view.get_serializer_context())
+    return data_response(view.get_paginated_response(
+        await represent_recipes(serializer, recipes)).data)
+
+
+@async_read(RecipeViewSet.as_view(
+    {'get': 'retrieve', 'put': 'update', 'patch': 'partial_update',
+     'delete': 'destroy'}, basename='recipe', detail=True))
+async def recipe_detail(request, id):
+    view = await run(initial_view, recipe_detail.fallback, request, id=id)
+    recipe = await run(view.get_object)
+    serializer = GetRecipeSerializer(context=view.get_serializer_context())
+    data, = await represent_recipes(serializer, [recipe])
+    return data_response(data)
+
+
+@async_read(CustomUserViewSet.as_view(
+    {'get': 'subscriptions'}, basename='user', detail=False,
+    **CustomUserViewSet.subscriptions.kwargs))
+async def subscriptions(request):
+    view = await run(initial_view, subscriptions.fallback, request)
+    authors = await run(view.paginate_queryset, view.get_subscriptions())
+    serializer = SubscriptionSerializer(context={
+        **view.get_serializer_context(), 'recipes': defaultdict(list)})
+    latest, _ = await asyncio.gather(
+        run(list, view.get_latest_recipes(authors)),
+        run(serializer.preload, authors),
+    )
+    for recipe in latest:
+        serializer.context['recipes'][recipe.author_id].append(recipe)
+    return data_response(view.get_paginated_response(
+        await run(lambda: [
+            serializer.to_representation(author) for author in authors
+        ])).data)
+
+
+@async_read(IngredientViewSet.as_view(
+    {'get': 'list'}, basename='ingredients', detail=False))
+async def ingredient_list(request):
+    return await run(ingredient_list.fallback, request)
+
+
+@async_read(TagViewSet.as_view(
+    {'get': 'list', 'post': 'create'}, basename='tag', detail=False))
+async def tag_list(request):
+    return await run(tag_list.fallback, request)
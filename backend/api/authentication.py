@@ -0,0 +1,60 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from foodgram.counters import counter_fields
+from users.models import User
+from .metrics import registry
+
+
+def token_cache_key(key):
+    return 'auth_token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def get_token_cache():
+    return caches[settings.AUTH_TOKEN_CACHE_ALIAS]
+
+
+def invalidate_tokens(keys):
+    keys = [token_cache_key(key) for key in keys]
+    if keys:
+        transaction.on_commit(lambda: get_token_cache().delete_many(keys))
+
+
+def invalidate_user_tokens(user_ids):
+    invalidate_tokens(Token.objects.filter(
+        user_id__in=user_ids).values_list('key', flat=True))
+
+
+def dump_user(user):
+    skipped = counter_fields(User) | {'password'}
+    return [
+        (field.attname, getattr(user, field.attname))
+        for field in User._meta.concrete_fields
+        if field.attname not in skipped
+    ]
+
+
+def load_user(fields):
+    names, values = zip(*fields)
+    return User.from_db('default', names, values)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+
+    def authenticate_credentials(self, key):
+        cache = get_token_cache()
+        cache_key = token_cache_key(key)
+        fields = cache.get(cache_key)
+        registry.count_cache('auth_token', fields is not None)
+        if fields is not None:
+            user = load_user(fields)
+            return user, Token(key=key, user=user)
+        user, token = super().authenticate_credentials(key)
+        cache.set(cache_key, dump_user(user),
+                  settings.AUTH_TOKEN_CACHE_TIMEOUT)
+        return user, token
@@ -0,0 +1,138 @@
+import statistics
+import time
+from dataclasses import dataclass
+
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from foodgram.models import Recipe, Tag
+from users.models import User
+
+
+@dataclass
+class Scenario:
+    name: str
+    url: str
+    max_queries: int
+    max_ms: float
+    anonymous: bool = False
+
+
+# Запросы, из которых складываются бюджеты сценариев при холодных кешах.
+AUTH = 1  # токен вместе с пользователем
+OBJECT = 1  # один объект по первичному ключу
+PAGE = 2  # COUNT и строки страницы
+CURSOR_PAGE = 1  # строки страницы без COUNT
+RECIPE_RELATIONS = 2  # теги и ингредиенты рецептов страницы
+VIEWER_FOLLOWING = 1  # подписки зрителя на авторов страницы
+LATEST_RECIPES = 1  # последние рецепты авторов страницы
+FEED_POSITIONS = 2  # записи ленты и ещё не разосланные рецепты
+AUTHOR_LOOKUP = 1  # проверка автора в фильтре
+CATALOG_VERSION = 1
+TAG_MAP = 1
+CATALOG_ROWS = 1
+SHOPPING_LIST = 1  # строки списка покупок
+
+SCENARIOS = (
+    Scenario('recipes', '/api/recipes/',
+             AUTH + PAGE + RECIPE_RELATIONS, 150),
+    Scenario('recipes-anonymous', '/api/recipes/',
+             PAGE + RECIPE_RELATIONS, 150, anonymous=True),
+    Scenario('recipes-cursor', '/api/recipes/?pagination=cursor',
+             AUTH + CURSOR_PAGE + RECIPE_RELATIONS, 150),
+    Scenario('recipes-filtered',
+             '/api/recipes/?tags={tag}&is_in_shopping_cart=0'
+             '&author={author}',
+             AUTH + AUTHOR_LOOKUP + CATALOG_VERSION + TAG_MAP + PAGE
+             + RECIPE_RELATIONS, 150),
+    Scenario('recipes-favorited', '/api/recipes/?is_favorited=1',
+             AUTH + PAGE + RECIPE_RELATIONS, 150),
+    Scenario('recipes-search', '/api/recipes/?search=суп',
+             AUTH + PAGE + RECIPE_RELATIONS, 200),
+    Scenario('recipe-detail', '/api/recipes/{recipe}/',
+             AUTH + OBJECT + RECIPE_RELATIONS, 100),
+    Scenario('favorites', '/api/recipes/favorites/',
+             AUTH + PAGE + RECIPE_RELATIONS, 150),
+    Scenario('subscriptions', '/api/users/subscriptions/',
+             AUTH + PAGE + LATEST_RECIPES + VIEWER_FOLLOWING, 150),
+    Scenario('feed', '/api/recipes/feed/',
+             AUTH + FEED_POSITIONS + CURSOR_PAGE + RECIPE_RELATIONS, 150),
+    Scenario('download-txt',
+             '/api/recipes/download_shopping_cart/?format=txt',
+             AUTH + SHOPPING_LIST, 100),
+    Scenario('download-pdf',
+             '/api/recipes/download_shopping_cart/?format=pdf',
+             AUTH + SHOPPING_LIST, 500),
+    Scenario('ingredients-search', '/api/ingredients/?name={ingredient}',
+             AUTH + CATALOG_VERSION + CATALOG_ROWS, 100),
+    Scenario('tags', '/api/tags/', AUTH + CATALOG_VERSION + CATALOG_ROWS, 50),
+    Scenario('users', '/api/users/', AUTH + PAGE + VIEWER_FOLLOWING, 100),
+    Scenario('user-detail', '/api/users/{author}/',
+             AUTH + OBJECT + VIEWER_FOLLOWING, 50),
+    Scenario('me', '/api/users/me/', AUTH, 50),
+)
+
+
+@dataclass
+class Result:
+    scenario: Scenario
+    status: int
+    queries: int
+    size: int
+    median_ms: float
+    max_ms: float
+
+    @property
+    def failures(self):
+        failures = []
+        if self.status != 200:
+            failures.append(f'статус {self.status}')
+        if self.queries > self.scenario.max_queries:
+            failures.append(
+                f'запросов {self.queries} > {self.scenario.max_queries}')
+        if self.median_ms > self.scenario.max_ms:
+            failures.append(
+                f'{self.median_ms:.1f} мс > {self.scenario.max_ms} мс')
+        return failures
+
+
+def measure(scenario, client, params, repeat):
+    url = scenario.url.format(**params)
+    for cache in caches.all():
+        cache.clear()
+    timings = []
+    queries = 0
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = client.get(url)
+            content = (b''.join(response.streaming_content)
+                       if response.streaming else response.content)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries = max(queries, len(context.captured_queries))
+    return Result(scenario, response.status_code, queries, len(content),
+                  statistics.median(timings), max(timings))
+
+
+def run(repeat=5, scenarios=SCENARIOS):
+    user = User.objects.order_by('-recipes_count').first()
+    token, created = Token.objects.get_or_create(user=user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    anonymous = APIClient()
+    params = {
+        'author': user.id,
+        'recipe': Recipe.objects.order_by('id').values_list(
+            'id', flat=True).first(),
+        'tag': Tag.objects.order_by('id').values_list(
+            'slug', flat=True).first(),
+        'ingredient': 'ингр',
+    }
+    return [
+        measure(scenario, anonymous if scenario.anonymous else client,
+                params, repeat)
+        for scenario in scenarios
+    ]
@@ -0,0 +1,74 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+from foodgram.models import CatalogVersion, Tag
+from .metrics import registry
+
+CATALOG_VERSION_KEY = 'catalog_version'
+
+
+def get_catalog_state():
+    state = cache.get(CATALOG_VERSION_KEY)
+    if state is None:
+        current = CatalogVersion.objects.using(DEFAULT_DB_ALIAS).current()
+        state = current.version, int(current.modified.timestamp())
+        cache.set(CATALOG_VERSION_KEY, state,
+                  settings.CATALOG_VERSION_TIMEOUT)
+    return state
+
+
+def get_catalog_version():
+    return get_catalog_state()[0]
+
+
+def bump_catalog_version():
+    CatalogVersion.objects.bump()
+    cache.delete(CATALOG_VERSION_KEY)
+    transaction.on_commit(lambda: cache.delete(CATALOG_VERSION_KEY))
+
+
+def get_tag_ids():
+    key = f'tag_ids:{get_catalog_version()}'
+    tag_ids = cache.get(key)
+    if tag_ids is None:
+        tag_ids = dict(Tag.objects.values_list('slug', 'id'))
+        cache.set(key, tag_ids, settings.CATALOG_CACHE_TIMEOUT)
+    return tag_ids
+
+
+class CatalogCacheMixin:
+
+    def list(self, request, *args, **kwargs):
+        return self.catalog_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.catalog_response(super().retrieve, request,
+                                     *args, **kwargs)
+
+    def catalog_response(self, handler, request, *args, **kwargs):
+        version, last_modified = get_catalog_state()
+        etag = quote_etag(f'{self.basename}-{version}')
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            key = f'catalog:{version}:{request.get_full_path()}'
+            data = cache.get(key)
+            registry.count_cache('catalog', data is not None)
+            if data is not None:
+                response = Response(data)
+            else:
+                response = handler(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                cache.set(key, response.data,
+                          settings.CATALOG_CACHE_TIMEOUT)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        response['Cache-Control'] = (
+            f'public, max-age={settings.CATALOG_CACHE_MAX_AGE}'
+        )
+        return response
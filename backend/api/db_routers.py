@@ -0,0 +1,103 @@
+import asyncio
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+
+current_state = ContextVar('replica_state', default=None)
+
+PIN_COOKIE = 'replica_pin'
+PIN_SALT = 'api.db_routers.pin'
+
+
+class ReplicaState:
+
+    def __init__(self):
+        self.replica = None
+        self.wrote = False
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        state = current_state.get()
+        if state is None or state.wrote:
+            return None
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = current_state.get()
+        if state is not None:
+            state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        state = ReplicaState()
+        token = current_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_state.reset(token)
+        self.pin(request, response, state)
+        return response
+
+    async def __acall__(self, request):
+        state = ReplicaState()
+        token = current_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_state.reset(token)
+        self.pin(request, response, state)
+        return response
+
+    def pin(self, request, response, state):
+        user = getattr(request, 'user', None)
+        if state.wrote and user is not None and user.is_authenticated:
+            response.set_signed_cookie(
+                PIN_COOKIE, user.id, salt=PIN_SALT,
+                max_age=settings.REPLICA_STICKY_SECONDS, httponly=True,
+                samesite='Lax',
+            )
+
+
+def is_pinned(request):
+    return request.get_signed_cookie(
+        PIN_COOKIE, default=None, salt=PIN_SALT,
+        max_age=settings.REPLICA_STICKY_SECONDS,
+    ) == str(request.user.id)
+
+
+def use_replica(request):
+    state = current_state.get()
+    if (
+        state is None
+        or not settings.DATABASE_REPLICAS
+        or request.method not in SAFE_METHODS
+        or request.user.is_authenticated and is_pinned(request)
+    ):
+        return
+    state.replica = random.choice(settings.DATABASE_REPLICAS)
+
+
+class ReplicaReadMixin:
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        use_replica(request)
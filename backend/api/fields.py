@@ -0,0 +1,110 @@
+import binascii
+import hashlib
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from PIL import Image
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+
+def resolve_primary_keys(queryset, pks):
+    objects = queryset.in_bulk(set(pks))
+    missing = sorted({pk for pk in pks if pk not in objects})
+    if missing:
+        raise serializers.ValidationError(
+            'Объекты не найдены: '
+            f'{", ".join(str(pk) for pk in missing)}'
+        )
+    return [objects[pk] for pk in pks]
+
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        return resolve_primary_keys(
+            self.child_relation.get_queryset(),
+            [self.child_relation.to_pk(item) for item in data]
+        )
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+    def to_pk(self, data):
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return self.get_queryset().model._meta.pk.to_python(data)
+        except (DjangoValidationError, TypeError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+class SpooledBase64ImageField(serializers.ImageField):
+    default_error_messages = {
+        'invalid_base64': 'Изображение должно быть строкой в base64!',
+        'too_large': 'Размер изображения не должен превышать {max_size} байт!',
+        'invalid_type': 'Недопустимый формат изображения!',
+    }
+    allowed_formats = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif',
+                       'WEBP': 'webp'}
+    chunk_size = 64 * 1024
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            self.fail('invalid_base64')
+        offset = data.find(';base64,')
+        offset = 0 if offset == -1 else offset + len(';base64,')
+        max_size = settings.RECIPE_IMAGE_MAX_SIZE
+        if (len(data) - offset) * 3 // 4 > max_size:
+            self.fail('too_large', max_size=max_size)
+        image = TemporaryUploadedFile('image', None, 0, None)
+        try:
+            digest = self.decode(data, offset, image)
+            image.seek(0)
+            try:
+                with Image.open(image.temporary_file_path()) as opened:
+                    image_format = opened.format
+            except (OSError, Image.DecompressionBombError):
+                self.fail('invalid_image')
+            if image_format not in self.allowed_formats:
+                self.fail('invalid_type')
+            image.name = f'{digest}.{self.allowed_formats[image_format]}'
+            image.content_type = Image.MIME[image_format]
+            return super().to_internal_value(image)
+        except serializers.ValidationError:
+            image.close()
+            raise
+
+    def decode(self, data, offset, output):
+        digest = hashlib.sha256()
+        pending = ''
+        for start in range(offset, len(data), self.chunk_size):
+            chunk = pending + ''.join(
+                data[start:start + self.chunk_size].split())
+            usable = len(chunk) - len(chunk) % 4
+            pending = chunk[usable:]
+            try:
+                decoded = binascii.a2b_base64(chunk[:usable])
+            except binascii.Error:
+                self.fail('invalid_base64')
+            digest.update(decoded)
+            output.write(decoded)
+        if pending or not output.tell():
+            self.fail('invalid_base64')
+        output.size = output.tell()
+        return digest.hexdigest()
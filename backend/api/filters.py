@@ -1,24 +1,61 @@
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import FilterSet, filters
-from foodgram.models import Ingredient, Recipe
+from foodgram.models import Favorite, Ingredient, Recipe, ShoppingCart
 from users.models import User
 
+from .caching import get_tag_ids
+
+TAG_MODES = (
+    ('any', 'Любой из тегов'),
+    ('all', 'Все теги'),
+)
+
+
+def tag_choices():
+    return [(slug, slug) for slug in get_tag_ids()]
+
 
 class RecipeFilter(FilterSet):
+    search = filters.CharFilter(method='search_recipes')
     author = filters.ModelChoiceFilter(queryset=User.objects.all())
-    tags = filters.AllValuesMultipleFilter(field_name='tags__slug')
+    tags = filters.MultipleChoiceFilter(
+        choices=tag_choices, method='filter_tags')
+    tags_mode = filters.ChoiceFilter(
+        choices=TAG_MODES, method='filter_tags_mode')
     is_favorited = filters.BooleanFilter(method='get_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='get_is_in_shopping_cart')
 
+    def search_recipes(self, queryset, name, value):
+        return queryset.search(value)
+
+    def filter_tags(self, queryset, name, value):
+        tag_ids = get_tag_ids()
+        tagged = Recipe.tags.through.objects.filter(recipe=OuterRef('pk'))
+        if self.form.cleaned_data.get('tags_mode') == 'all':
+            for slug in set(value):
+                queryset = queryset.filter(
+                    Exists(tagged.filter(tag_id=tag_ids[slug])))
+            return queryset
+        return queryset.filter(Exists(tagged.filter(
+            tag_id__in=[tag_ids[slug] for slug in value])))
+
+    def filter_tags_mode(self, queryset, name, value):
+        return queryset
+
+    def filter_user_relation(self, queryset, model, value):
+        user = self.request.user
+        if user.is_anonymous:
+            return queryset.none() if value else queryset
+        related = Exists(model.objects.filter(
+            user=user, recipe=OuterRef('pk')))
+        return queryset.filter(related if value else ~related)
+
     def get_is_favorited(self, queryset, name, value):
-        return queryset.filter(
-            in_favorite__user=self.request.user
-        )
+        return self.filter_user_relation(queryset, Favorite, value)
 
     def get_is_in_shopping_cart(self, queryset, name, value):
-        return queryset.filter(
-            in_shopping_list__user=self.request.user
-        )
+        return self.filter_user_relation(queryset, ShoppingCart, value)
 
     class Meta:
         model = Recipe
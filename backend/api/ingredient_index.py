@@ -0,0 +1,133 @@
+import heapq
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Count
+
+from foodgram.models import Ingredient
+from .caching import get_catalog_version
+
+
+def normalize(value):
+    value = unicodedata.normalize('NFKC', value or '').casefold()
+    return ' '.join(value.replace('ё', 'е').split())
+
+
+def trigrams(value):
+    grams = set()
+    for word in value.split():
+        word = f'  {word} '
+        grams.update(word[i:i + 3] for i in range(len(word) - 2))
+    return grams
+
+
+class IngredientIndex:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.keys = []
+        self.entries = []
+        self.postings = {}
+        self.version = None
+
+    def is_stale(self):
+        return self.version is None or get_catalog_version() != self.version
+
+    def load(self):
+        version = get_catalog_version()
+        ingredients = Ingredient.objects.annotate(
+            popularity=Count('ingredient_recipes')
+        ).values_list('id', 'name', 'measurement_unit', 'popularity')
+        entries = sorted(
+            (normalize(name), -popularity, ingredient_id, {
+                'id': ingredient_id,
+                'name': name,
+                'measurement_unit': measurement_unit,
+            })
+            for ingredient_id, name, measurement_unit, popularity
+            in ingredients.order_by().iterator()
+        )
+        postings = defaultdict(list)
+        for position, (key, _, _, _) in enumerate(entries):
+            for gram in trigrams(key):
+                postings[gram].append(position)
+        self.keys = [key for key, _, _, _ in entries]
+        self.entries = entries
+        self.postings = dict(postings)
+        self.version = version
+
+    def ensure_loaded(self):
+        if self.is_stale():
+            with self.lock:
+                if self.is_stale():
+                    self.load()
+
+    def search(self, name='', limit=None):
+        self.ensure_loaded()
+        keys, entries = self.keys, self.entries
+        prefix = normalize(name)
+        if not prefix:
+            return [entry for _, _, _, entry in entries][:limit]
+        matches = []
+        position = bisect_left(keys, prefix)
+        while position < len(keys) and keys[position].startswith(prefix):
+            key, popularity, _, entry = entries[position]
+            matches.append((key != prefix, popularity, position, entry))
+            position += 1
+        if limit is not None:
+            matches = heapq.nsmallest(limit, matches)
+        else:
+            matches.sort()
+        return [entry for _, _, _, entry in matches]
+
+    def fuzzy_search(self, name, limit=None):
+        self.ensure_loaded()
+        keys, entries, postings = self.keys, self.entries, self.postings
+        query = trigrams(normalize(name))
+        candidates = set()
+        for grams in sorted((postings.get(gram, ()) for gram in query),
+                            key=len):
+            if (candidates and len(candidates) + len(grams)
+                    > settings.INGREDIENT_FUZZY_MAX_CANDIDATES):
+                break
+            candidates.update(grams)
+        matches = []
+        for position in candidates:
+            grams = trigrams(keys[position])
+            shared = len(query & grams)
+            similarity = shared / (len(query) + len(grams) - shared)
+            if similarity >= settings.INGREDIENT_FUZZY_THRESHOLD:
+                _, popularity, _, entry = entries[position]
+                matches.append((-similarity, popularity, position, entry))
+        if limit is not None:
+            matches = heapq.nsmallest(limit, matches)
+        else:
+            matches.sort()
+        return [entry for _, _, _, entry in matches]
+
+
+def fuzzy_search(name, limit=None):
+    queryset = Ingredient.objects.all()
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return ingredient_index.fuzzy_search(name, limit)
+    from django.contrib.postgres.search import TrigramSimilarity
+    with transaction.atomic(using=queryset.db):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT set_config('pg_trgm.similarity_threshold', %s, true)",
+                [str(settings.INGREDIENT_FUZZY_THRESHOLD)])
+        return list(queryset.filter(
+            name__trigram_similar=name
+        ).annotate(
+            similarity=TrigramSimilarity('name', name)
+        ).order_by('-similarity', 'name').values(
+            'id', 'name', 'measurement_unit'
+        )[:limit])
+
+
+ingredient_index = IngredientIndex()
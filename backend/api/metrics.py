@@ -0,0 +1,265 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+logger = logging.getLogger('foodgram.slow_requests')
+
+current_record = ContextVar('request_record', default=None)
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        str(value).replace('\\', '\\\\').replace('"', '\\"').replace(
+            '\n', '\\n')
+        for value in labels.values()
+    )
+    return '{' + ','.join(
+        f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+
+class Histogram:
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name, labels):
+        cumulative = 0
+        for bound, count in zip((*self.buckets, '+Inf'), self.counts):
+            cumulative += count
+            yield (f'{name}_bucket{format_labels({**labels, "le": bound})} '
+                   f'{cumulative}')
+        yield f'{name}_sum{format_labels(labels)} {self.sum}'
+        yield f'{name}_count{format_labels(labels)} {self.count}'
+
+
+class Registry:
+    metrics = {
+        'foodgram_http_requests_total': (
+            'counter', 'Количество обработанных запросов'),
+        'foodgram_http_request_duration_seconds': (
+            'histogram', 'Время обработки запроса'),
+        'foodgram_http_response_size_bytes': (
+            'histogram', 'Размер ответа'),
+        'foodgram_db_queries': (
+            'histogram', 'Количество SQL-запросов на HTTP-запрос'),
+        'foodgram_db_query_duration_seconds_total': (
+            'counter', 'Суммарное время SQL-запросов'),
+        'foodgram_cache_requests_total': (
+            'counter', 'Обращения к кешам приложения в этом процессе'),
+    }
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {name: {} for name in self.metrics}
+
+    def histogram(self, name, labels, value, buckets):
+        key = tuple(labels.items())
+        with self.lock:
+            histogram = self.values[name].get(key)
+            if histogram is None:
+                histogram = self.values[name][key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def increment(self, name, labels, value=1):
+        key = tuple(labels.items())
+        with self.lock:
+            self.values[name][key] = self.values[name].get(key, 0) + value
+
+    def count_cache(self, cache, hit, value=1):
+        self.increment('foodgram_cache_requests_total',
+                       {'cache': cache, 'result': 'hit' if hit else 'miss'},
+                       value)
+
+    def observe_request(self, record):
+        route = {'route': record.route, 'method': record.method}
+        self.increment('foodgram_http_requests_total',
+                       {**route, 'status': record.status})
+        self.histogram('foodgram_http_request_duration_seconds', route,
+                       record.duration, settings.METRICS_LATENCY_BUCKETS)
+        self.histogram('foodgram_http_response_size_bytes', route,
+                       record.size, settings.METRICS_SIZE_BUCKETS)
+        self.histogram('foodgram_db_queries', route, record.queries,
+                       settings.METRICS_QUERY_BUCKETS)
+        self.increment('foodgram_db_query_duration_seconds_total', route,
+                       record.query_time)
+
+    def render(self):
+        lines = []
+        with self.lock:
+            values = {name: dict(series) for name, series in
+                      self.values.items()}
+        for name, (kind, description) in self.metrics.items():
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+            for key, value in sorted(values[name].items()):
+                labels = dict(key)
+                if kind == 'histogram':
+                    lines.extend(value.render(name, labels))
+                else:
+                    lines.append(f'{name}{format_labels(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class RequestRecord:
+
+    def __init__(self, request, collect_sql):
+        self.request = request
+        self.method = request.method
+        self.collect_sql = collect_sql
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.query_time = 0
+        self.statements = []
+        self.lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            with self.lock:
+                self.queries += 1
+                self.query_time += duration
+                if self.collect_sql:
+                    self.statements.append((duration, sql))
+
+    @property
+    def route(self):
+        match = getattr(self.request, 'resolver_match', None)
+        return match.view_name if match else 'unmatched'
+
+    def finish(self, response, size):
+        self.duration = time.perf_counter() - self.started
+        self.status = response.status_code
+        self.size = size
+        if self.route == 'metrics':
+            return
+        registry.observe_request(self)
+        threshold = settings.METRICS_SLOW_REQUEST_MS
+        if threshold is not None and self.duration * 1000 >= threshold:
+            self.log_slow_request()
+
+    def log_slow_request(self):
+        statements = sorted(self.statements, reverse=True)
+        logger.warning(json.dumps({
+            'event': 'slow_request',
+            'route': self.route,
+            'method': self.method,
+            'path': self.request.get_full_path(),
+            'status': self.status,
+            'duration_ms': round(self.duration * 1000, 1),
+            'queries': self.queries,
+            'db_ms': round(self.query_time * 1000, 1),
+            'size': self.size,
+            'sql': [
+                {'ms': round(duration * 1000, 2), 'sql': sql}
+                for duration, sql in statements[
+                    :settings.METRICS_SLOW_REQUEST_SQL_LIMIT]
+            ],
+        }, ensure_ascii=False))
+
+
+def record_query(execute, sql, params, many, context):
+    record = current_record.get()
+    if record is None:
+        return execute(sql, params, many, context)
+    return record(execute, sql, params, many, context)
+
+
+def install_query_recorder(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def recording(record):
+    token = current_record.set(record)
+    try:
+        yield
+    finally:
+        current_record.reset(token)
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+        for connection in connections.all():
+            install_query_recorder(connection)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        record = RequestRecord(
+            request, settings.METRICS_SLOW_REQUEST_MS is not None)
+        with recording(record):
+            response = self.get_response(request)
+        return self.process_response(response, record)
+
+    async def __acall__(self, request):
+        record = RequestRecord(
+            request, settings.METRICS_SLOW_REQUEST_MS is not None)
+        with recording(record):
+            response = await self.get_response(request)
+        return self.process_response(response, record)
+
+    def process_response(self, response, record):
+        if response.streaming:
+            response.streaming_content = self.stream(
+                response, response.streaming_content, record)
+        else:
+            record.finish(response, len(response.content))
+        return response
+
+    def stream(self, response, content, record):
+        size = 0
+        chunks = iter(content)
+        try:
+            while True:
+                with recording(record):
+                    chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                size += len(chunk)
+                yield chunk
+        finally:
+            record.finish(response, size)
+
+
+def metrics_view(request):
+    # Без настроенного токена метрики закрыты: в них видны маршруты,
+    # задержки и число SQL-запросов.
+    token = settings.METRICS_TOKEN
+    if not token or not constant_time_compare(
+            request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(),
+                        content_type='text/plain; version=0.0.4')
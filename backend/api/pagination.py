@@ -0,0 +1,76 @@
+from datetime import datetime
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (Cursor, CursorPagination,
+                                       PageNumberPagination)
+from rest_framework.response import Response
+
+from foodgram.timelines import read
+
+
+class RecipeCursorPagination(CursorPagination):
+    ordering = ('-pub_date', '-id')
+    search_ordering = ('-search_rank', '-pub_date', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        if 'search_rank' in queryset.query.annotations:
+            return self.search_ordering
+        return self.ordering
+
+
+class RecipePagination(PageNumberPagination):
+    mode_query_param = 'pagination'
+
+    def __init__(self):
+        self.cursor_pagination = RecipeCursorPagination()
+        self.use_cursor = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_cursor = (
+            self.cursor_pagination.cursor_query_param in request.query_params
+            or request.query_params.get(self.mode_query_param) == 'cursor'
+        )
+        if self.use_cursor:
+            return self.cursor_pagination.paginate_queryset(
+                queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.use_cursor:
+            return self.cursor_pagination.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.use_cursor:
+            return self.cursor_pagination.to_html()
+        return super().to_html()
+
+
+class FeedPagination(CursorPagination):
+
+    def paginate_feed(self, request, user):
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        position = None
+        if cursor is not None:
+            try:
+                pub_date, recipe_id = cursor.position.split('|')
+                position = (datetime.fromisoformat(pub_date), int(recipe_id))
+            except (AttributeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+        positions = read(user.id, position, self.page_size + 1)
+        self.has_next = len(positions) > self.page_size
+        self.page = positions[:self.page_size]
+        return [recipe_id for pub_date, recipe_id in self.page]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        pub_date, recipe_id = self.page[-1]
+        return self.encode_cursor(Cursor(
+            offset=0, reverse=False,
+            position=f'{pub_date.isoformat()}|{recipe_id}'))
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
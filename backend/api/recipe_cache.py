@@ -0,0 +1,163 @@
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .metrics import registry
+
+GLOBAL_VERSION_KEY = 'recipe_cache:version'
+
+
+def recipe_version_key(recipe_id):
+    return f'recipe_cache:recipe:{recipe_id}'
+
+
+def user_version_key(user_id):
+    return f'recipe_cache:user:{user_id}'
+
+
+def new_version():
+    return time.time(), uuid.uuid4().hex
+
+
+def mark_request(request):
+    request.recipe_cache_started = time.time()
+
+
+class RecipeCache:
+
+    @property
+    def cache(self):
+        return caches[settings.RECIPE_CACHE_ALIAS]
+
+    def get_versions(self, keys):
+        versions = self.cache.get_many(keys)
+        missing = {key: new_version() for key in keys if key not in versions}
+        if missing:
+            self.cache.set_many(missing, None)
+            versions.update(missing)
+        return versions
+
+    def make_keys(self, prefix, recipes, started=None):
+        versions = self.get_versions(
+            {GLOBAL_VERSION_KEY}
+            | {recipe_version_key(recipe.id) for recipe in recipes}
+            | {user_version_key(recipe.author_id) for recipe in recipes}
+        )
+        keys = {}
+        for recipe in recipes:
+            recipe_versions = (
+                versions[GLOBAL_VERSION_KEY],
+                versions[recipe_version_key(recipe.id)],
+                versions[user_version_key(recipe.author_id)],
+            )
+            # Строки рецепта могли быть прочитаны до коммита, который
+            # выпустил более позднюю версию, поэтому фрагмент не кешируется.
+            if started is not None and any(
+                written >= started - settings.RECIPE_CACHE_CLOCK_SKEW
+                for written, token in recipe_versions
+            ):
+                keys[recipe.id] = None
+                continue
+            keys[recipe.id] = ':'.join(
+                (prefix, str(recipe.id))
+                + tuple(token for written, token in recipe_versions)
+            )
+        return keys
+
+    def get_many(self, prefix, recipes, started=None):
+        keys = self.make_keys(prefix, recipes, started)
+        found = self.cache.get_many(
+            [key for key in keys.values() if key is not None])
+        fragments = {
+            recipe_id: found[key]
+            for recipe_id, key in keys.items() if key in found
+        }
+        registry.count_cache('recipe', True, len(fragments))
+        registry.count_cache('recipe', False, len(keys) - len(fragments))
+        return keys, fragments
+
+    def set(self, key, fragment):
+        if key is not None:
+            self.cache.set(key, fragment, settings.RECIPE_CACHE_TIMEOUT)
+
+    def invalidate(self, keys):
+        transaction.on_commit(lambda: self.cache.set_many(
+            {key: new_version() for key in keys}, None))
+
+    def invalidate_recipes(self, recipe_ids):
+        self.invalidate([recipe_version_key(pk) for pk in recipe_ids])
+
+    def invalidate_users(self, user_ids):
+        self.invalidate([user_version_key(pk) for pk in user_ids])
+
+    def invalidate_all(self):
+        self.invalidate([GLOBAL_VERSION_KEY])
+
+
+recipe_cache = RecipeCache()
+
+
+class CachedRepresentationMixin:
+    viewer_fields = ()
+
+    @property
+    def cache_prefix(self):
+        request = self.context.get('request')
+        base = request.build_absolute_uri('/') if request is not None else ''
+        return f'{type(self).__name__}:{base}'
+
+    def preload(self, instances):
+        super().preload(instances)
+        self.preload_missing(self.load_fragments(instances))
+
+    @property
+    def cache_started(self):
+        return getattr(self.context.get('request'), 'recipe_cache_started',
+                       None)
+
+    def load_fragments(self, instances):
+        self.fragment_keys, self.fragments = recipe_cache.get_many(
+            self.cache_prefix, instances, self.cache_started)
+        return [
+            instance for instance in instances
+            if instance.id not in self.fragments
+        ]
+
+    def preload_missing(self, instances):
+        pass
+
+    def get_fragment(self, instance):
+        fragments = getattr(self, 'fragments', {})
+        if instance.id in fragments:
+            return fragments[instance.id]
+        keys = getattr(self, 'fragment_keys', {})
+        if instance.id in keys:
+            key = keys[instance.id]
+        else:
+            keys, fragments = recipe_cache.get_many(
+                self.cache_prefix, [instance], self.cache_started)
+            if fragments:
+                return fragments[instance.id]
+            key = keys[instance.id]
+            self.preload_missing([instance])
+        fragment = super().to_representation(instance)
+        for field in self.viewer_fields:
+            fragment.pop(field, None)
+        recipe_cache.set(key, fragment)
+        return fragment
+
+    def to_representation(self, instance):
+        return self.add_viewer_data(instance, self.get_fragment(instance))
+
+    def add_viewer_data(self, instance, fragment):
+        return fragment
+
+
+class RecipeCacheMixin:
+
+    def initial(self, request, *args, **kwargs):
+        mark_request(request)
+        super().initial(request, *args, **kwargs)
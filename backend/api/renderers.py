@@ -0,0 +1,137 @@
+import abc
+import csv
+import json
+import os
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from rest_framework import renderers
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+
+class ShoppingListRenderer(abc.ABC, renderers.BaseRenderer):
+    charset = 'utf-8'
+    chunk_size = 64 * 1024
+
+    @property
+    def content_type(self):
+        if self.charset:
+            return f'{self.media_type}; charset={self.charset}'
+        return self.media_type
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = (renderer_context or {}).get('response')
+        if response is not None and response.status_code >= 400:
+            response['Content-Type'] = 'application/json'
+            return renderers.JSONRenderer().render(data)
+        if isinstance(data, dict):
+            data = [(key, '', value) for key, value in data.items()]
+        return b''.join(self.stream(data))
+
+    def stream(self, rows):
+        buffer = []
+        size = 0
+        for row in rows:
+            line = self.render_row(*row).encode('utf-8')
+            buffer.append(line)
+            size += len(line)
+            if size >= self.chunk_size:
+                yield b''.join(buffer)
+                buffer = []
+                size = 0
+        buffer.append(self.render_end().encode('utf-8'))
+        yield b''.join(buffer)
+
+    @abc.abstractmethod
+    def render_row(self, name, measurement_unit, amount):
+        pass
+
+    def render_end(self):
+        return ''
+
+
+class TextShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def render_row(self, name, measurement_unit, amount):
+        return f'{name} - {amount} {measurement_unit}\n'
+
+
+class _Line:
+
+    def write(self, value):
+        return value
+
+
+class CSVShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def render_row(self, name, measurement_unit, amount):
+        return csv.writer(_Line()).writerow(
+            (name, measurement_unit, amount)
+        )
+
+
+class JSONShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'application/json'
+    format = 'json'
+
+    def stream(self, rows):
+        self.separator = '['
+        yield from super().stream(rows)
+
+    def render_row(self, name, measurement_unit, amount):
+        separator, self.separator = self.separator, ','
+        return separator + json.dumps({
+            'name': name,
+            'measurement_unit': measurement_unit,
+            'amount': amount,
+        }, ensure_ascii=False)
+
+    def render_end(self):
+        return ']' if self.separator == ',' else '[]'
+
+
+class PDFShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+    font_size = 12
+    line_height = 18
+    margin = 50
+
+    def get_font(self):
+        font_path = settings.SHOPPING_LIST_PDF_FONT
+        if not font_path or not os.path.exists(font_path):
+            return 'Helvetica'
+        font_name = os.path.splitext(os.path.basename(font_path))[0]
+        if font_name not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(TTFont(font_name, font_path))
+        return font_name
+
+    def render_row(self, name, measurement_unit, amount):
+        return f'{name} - {amount} {measurement_unit}'
+
+    def stream(self, rows):
+        with SpooledTemporaryFile(max_size=self.chunk_size) as output:
+            pdf = canvas.Canvas(output, pagesize=A4)
+            font = self.get_font()
+            width, height = A4
+            y = height - self.margin
+            pdf.setFont(font, self.font_size)
+            for name, measurement_unit, amount in rows:
+                if y < self.margin:
+                    pdf.showPage()
+                    pdf.setFont(font, self.font_size)
+                    y = height - self.margin
+                pdf.drawString(self.margin, y, self.render_row(
+                    name, measurement_unit, amount))
+                y -= self.line_height
+            pdf.save()
+            output.seek(0)
+            yield from iter(lambda: output.read(self.chunk_size), b'')
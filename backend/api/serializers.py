@@ -1,9 +1,16 @@
+from django.db import transaction
+from django.db.models import prefetch_related_objects
 from rest_framework import serializers
-from drf_extra_fields.fields import Base64ImageField
-from foodgram.models import (Tag, Ingredient, Recipe,
-                             Favorite, ShoppingCart, RecipeIngredients)
+from foodgram.models import (Tag, Ingredient, Recipe, Favorite, ShoppingCart,
+                             ShoppingCartIngredient, RecipeIngredients)
 from users.models import User, Subscribe
 from djoser.serializers import UserCreateSerializer
+from foodgram.images import schedule_image_processing
+from foodgram.models import recipe_prefetches
+from .recipe_cache import CachedRepresentationMixin
+from .fields import (BulkPrimaryKeyRelatedField, SpooledBase64ImageField,
+                     resolve_primary_keys)
+from .viewer import ViewerListSerializer, ViewerSerializerMixin
 
 
 class UserCreateSerializer(UserCreateSerializer):
@@ -13,7 +20,7 @@ class UserCreateSerializer(UserCreateSerializer):
                   'first_name', 'last_name', 'password')
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(ViewerSerializerMixin, serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField(
         'get_is_subscribed')
 
@@ -21,15 +28,14 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = ('id', 'username', 'email',
                   'first_name', 'last_name', 'is_subscribed')
+        list_serializer_class = ViewerListSerializer
+
+    def preload(self, instances):
+        self.viewer.load_users(user.id for user in instances
+                               if not hasattr(user, 'is_subscribed'))
 
     def get_is_subscribed(self, obj):
-        if self.context.get('request'):
-            user = self.context.get('request').user
-            if user.is_anonymous:
-                return False
-            return Subscribe.objects.filter(user=user,
-                                            following=obj.id).exists()
-        return False
+        return self.viewer.is_subscribed(obj)
 
 
 class ShoppingCartSerializer(serializers.ModelSerializer):
@@ -66,25 +72,67 @@ class IngredientsRecipeSerializer(serializers.ModelSerializer):
         model = RecipeIngredients
 
 
+class IngredientRecipeListSerializer(serializers.ListSerializer):
+
+    def to_internal_value(self, data):
+        value = super().to_internal_value(data)
+        ingredients = resolve_primary_keys(
+            Ingredient.objects.all(),
+            [ingredient.pop('ingredient_id') for ingredient in value]
+        )
+        for item, ingredient in zip(value, ingredients):
+            item['ingredient'] = ingredient
+        return value
+
+
 class IngredientRecipeSerializer(serializers.ModelSerializer):
 
-    id = serializers.PrimaryKeyRelatedField(
-        source='ingredient',
-        queryset=Ingredient.objects.all()
-    )
+    id = serializers.IntegerField(source='ingredient_id')
 
     class Meta:
         fields = ('id', 'amount')
         model = RecipeIngredients
-
-
-class GetRecipeSerializer(serializers.ModelSerializer):
+        list_serializer_class = IngredientRecipeListSerializer
+
+
+class RecipeImageVariantsField(serializers.Field):
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def build_url(self, storage, name):
+        url = storage.url(name)
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+    def to_representation(self, recipe):
+        if not recipe.image:
+            return None
+        storage = recipe.image.storage
+        variants = {
+            variant: {
+                extension: self.build_url(storage, name)
+                for extension, name in names.items()
+            }
+            for variant, names in recipe.image_variants.items()
+        }
+        variants['original'] = self.build_url(storage, recipe.image.name)
+        return variants
+
+
+class GetRecipeSerializer(CachedRepresentationMixin, ViewerSerializerMixin,
+                          serializers.ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
     author = UserSerializer(read_only=True)
     ingredients = serializers.SerializerMethodField(
         'get_ingredients'
     )
-    image = Base64ImageField()
+    image = SpooledBase64ImageField()
+    image_variants = RecipeImageVariantsField()
     is_favorited = serializers.SerializerMethodField(
         'get_is_favorited'
     )
@@ -103,43 +151,78 @@ class GetRecipeSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_variants',
             'text',
             'cooking_time',
         )
+        list_serializer_class = ViewerListSerializer
+
+    viewer_fields = ('is_favorited', 'is_in_shopping_cart')
+
+    def preload(self, instances):
+        flagged = [recipe for recipe in instances
+                   if not hasattr(recipe, 'is_favorited')]
+        self.viewer.load_recipes(recipe.id for recipe in flagged)
+        self.viewer.load_users(recipe.author_id for recipe in flagged)
+        super().preload(instances)
+
+    def preload_missing(self, instances):
+        prefetch_related_objects(instances, *recipe_prefetches())
+
+    def to_representation(self, instance):
+        if hasattr(instance, 'is_author_subscribed') and instance.author:
+            instance.author.is_subscribed = instance.is_author_subscribed
+        return super().to_representation(instance)
+
+    def add_viewer_data(self, instance, fragment):
+        data = {}
+        for field in self.Meta.fields:
+            if field == 'author' and fragment['author'] is not None:
+                data['author'] = {
+                    **fragment['author'],
+                    'is_subscribed': self.viewer.is_subscribed(
+                        instance.author),
+                }
+            elif field == 'is_favorited':
+                data[field] = self.viewer.is_favorited(instance)
+            elif field == 'is_in_shopping_cart':
+                data[field] = self.viewer.is_in_shopping_cart(instance)
+            else:
+                data[field] = fragment[field]
+        return data
 
     def get_ingredients(self, obj):
-        ingredients_data = RecipeIngredients.objects.filter(recipe=obj)
+        ingredients_data = obj.ingredient_recipes.all()
         ingredients = IngredientsRecipeSerializer(ingredients_data,
                                                   many=True).data
         return ingredients
 
     def get_is_favorited(self, obj):
-        if self.context.get('request'):
-            request_user = self.context.get('request').user
-            if request_user.is_anonymous:
-                return False
-            return Favorite.objects.filter(user=request_user,
-                                           recipe=obj).exists()
-        return False
+        return self.viewer.is_favorited(obj)
 
     def get_is_in_shopping_cart(self, obj):
-        if self.context.get('request'):
-            request_user = self.context.get('request').user
-            if request_user.is_anonymous:
-                return False
-            return ShoppingCart.objects.filter(user=request_user,
-                                               recipe=obj).exists()
-        return False
+        return self.viewer.is_in_shopping_cart(obj)
+
+
+class ShortRecipeSerializer(CachedRepresentationMixin, ViewerSerializerMixin,
+                            serializers.ModelSerializer):
+    image = SpooledBase64ImageField(read_only=True)
+    image_variants = RecipeImageVariantsField()
+
+    class Meta:
+        model = Recipe
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
+        list_serializer_class = ViewerListSerializer
 
 
 class PostRecipeSerializer(serializers.ModelSerializer):
-    tags = serializers.PrimaryKeyRelatedField(queryset=Tag.objects.all(),
-                                              many=True)
+    tags = BulkPrimaryKeyRelatedField(queryset=Tag.objects.all(),
+                                      many=True)
     author = UserSerializer(read_only=True)
     ingredients = IngredientRecipeSerializer(
         many=True,
         source='ingredient_recipes')
-    image = Base64ImageField()
+    image = SpooledBase64ImageField()
 
     class Meta:
         model = Recipe
@@ -149,66 +232,98 @@ class PostRecipeSerializer(serializers.ModelSerializer):
         )
 
     def validate_ingredients(self, value):
-        ingredient_data = value
-        if not ingredient_data:
+        if not value:
             raise serializers.ValidationError({
                 'Нужен хотя бы один ингредиент!'
             })
-        ingredients_list = []
-        for ingredient in ingredient_data:
-            ingredient_id = ingredient['ingredient']
-            if ingredient_id in ingredients_list:
-                raise serializers.ValidationError({
-                    'Ингридиенты не могут повторяться!'
-                })
-            if int(ingredient['amount']) <= 0:
-                raise serializers.ValidationError({
-                    'Количество ингредиента должно быть больше 0!'
-                })
-            ingredients_list.append(ingredient_id)
+        ingredient_ids = {ingredient['ingredient'].id for ingredient in value}
+        if len(ingredient_ids) != len(value):
+            raise serializers.ValidationError({
+                'Ингридиенты не могут повторяться!'
+            })
+        if any(int(ingredient['amount']) <= 0 for ingredient in value):
+            raise serializers.ValidationError({
+                'Количество ингредиента должно быть больше 0!'
+            })
         return value
 
     def validate_tags(self, value):
-        tags_data = value
-        if not tags_data:
+        if not value:
             raise serializers.ValidationError({
                 'Нужно выбрать хотя бы один тег!'
             })
-        tags_list = []
-        for tag in tags_data:
-            if tag in tags_list:
-                raise serializers.ValidationError({
-                    'Теги должны быть уникальными!'
-                })
-            tags_list.append(tag)
+        if len(set(value)) != len(value):
+            raise serializers.ValidationError({
+                'Теги должны быть уникальными!'
+            })
         return value
 
     def add_ingredients(self, ingredient_data, recipe):
-        for ingredient in ingredient_data:
-            ingredient_id = ingredient['ingredient']
-            amount = ingredient['amount']
-            RecipeIngredients.objects.create(
-                ingredient=ingredient_id,
+        RecipeIngredients.objects.bulk_create([
+            RecipeIngredients(
+                ingredient=ingredient['ingredient'],
                 recipe=recipe,
-                amount=amount
+                amount=ingredient['amount']
             )
+            for ingredient in ingredient_data
+        ])
+
+    def update_ingredients(self, ingredient_data, recipe):
+        current = {
+            row.ingredient_id: row for row in recipe.ingredient_recipes.all()
+        }
+        amounts = {
+            ingredient['ingredient'].id: ingredient['amount']
+            for ingredient in ingredient_data
+        }
+        RecipeIngredients.objects.filter(recipe=recipe).exclude(
+            ingredient__in=amounts).delete()
+        changes = {
+            ingredient_id: amount - getattr(current.get(ingredient_id),
+                                            'amount', 0)
+            for ingredient_id, amount in amounts.items()
+        }
+        updated = []
+        for ingredient_id, amount in amounts.items():
+            row = current.get(ingredient_id)
+            if row is not None and row.amount != amount:
+                row.amount = amount
+                updated.append(row)
+        if updated:
+            RecipeIngredients.objects.bulk_update(updated, ['amount'])
+        self.add_ingredients(
+            [ingredient for ingredient in ingredient_data
+             if ingredient['ingredient'].id not in current],
+            recipe
+        )
+        # bulk_update и bulk_create не отправляют сигналы, поэтому
+        # суммы списков покупок для них обновляются здесь.
+        ShoppingCartIngredient.objects.apply(
+            recipe.in_shopping_list.values_list('user_id', flat=True),
+            changes
+        )
 
+    @transaction.atomic
     def create(self, validated_data):
         tags_data = validated_data.pop('tags')
         ingredients_data = validated_data.pop('ingredient_recipes')
         author = self.context.get('request').user
         recipe = Recipe.objects.create(author=author, **validated_data)
+        validated_data['image'].close()
         self.add_ingredients(ingredients_data, recipe)
         recipe.tags.set(tags_data)
+        schedule_image_processing(recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         tags_data = validated_data.pop('tags')
         ingredients_data = validated_data.pop('ingredient_recipes')
         instance.tags.set(tags_data)
-        instance.image = validated_data.get(
-            'image', instance.image
-        )
+        if 'image' in validated_data:
+            instance.image = validated_data['image']
+            instance.image_variants = {}
+            schedule_image_processing(instance)
         instance.name = validated_data.get(
             'name', instance.name
         )
@@ -218,20 +333,19 @@ class PostRecipeSerializer(serializers.ModelSerializer):
         instance.cooking_time = validated_data.get(
             'cooking_time', instance.cooking_time
         )
-        instance.ingredients.clear()
-        self.add_ingredients(ingredients_data, instance)
+        self.update_ingredients(ingredients_data, instance)
         instance.save()
+        if 'image' in validated_data:
+            validated_data['image'].close()
         return instance
 
 
-class SubscriptionSerializer(serializers.ModelSerializer):
+class SubscriptionSerializer(ViewerSerializerMixin,
+                             serializers.ModelSerializer):
 
     is_subscribed = serializers.SerializerMethodField(
         'get_is_subscribed'
     )
-    recipes_count = serializers.SerializerMethodField(
-        'get_recipes_count'
-    )
     recipes = serializers.SerializerMethodField(
         'get_recipes'
     )
@@ -241,23 +355,24 @@ class SubscriptionSerializer(serializers.ModelSerializer):
         fields = ('id', 'username', 'email', 'first_name',
                   'last_name', 'is_subscribed',
                   'recipes_count', 'recipes')
+        list_serializer_class = ViewerListSerializer
+
+    def preload(self, instances):
+        self.viewer.load_users(user.id for user in instances
+                               if not hasattr(user, 'is_subscribed'))
 
     def get_is_subscribed(self, obj):
-        if self.context.get('request'):
-            user = self.context.get('request').user
-            if user.is_anonymous:
-                return False
-            return Subscribe.objects.filter(
-                user=user,
-                following=obj.id).exists()
-        return False
-
-    def get_recipes_count(self, obj):
-        return Recipe.objects.filter(author=obj).count()
+        return self.viewer.is_subscribed(obj)
 
     def get_recipes(self, obj):
-        recipes = Recipe.objects.filter(author=obj)
-        serializer = GetRecipeSerializer(recipes, many=True)
+        recipes = self.context.get('recipes')
+        if recipes is None:
+            recipes = Recipe.objects.latest_per_author(
+                [obj], self.context.get('recipes_limit'))
+        else:
+            recipes = recipes.get(obj.id, [])
+        serializer = ShortRecipeSerializer(recipes, many=True,
+                                           context=self.context)
         return serializer.data
 
 
@@ -0,0 +1,84 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (m2m_changed, post_delete, post_init,
+                                      post_save)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from foodgram.models import Ingredient, Recipe, RecipeIngredients, Tag
+from users.models import User
+from .authentication import invalidate_tokens, invalidate_user_tokens
+from .caching import bump_catalog_version
+from .metrics import install_query_recorder
+from .recipe_cache import recipe_cache
+
+
+@receiver(connection_created)
+def record_queries(sender, connection, **kwargs):
+    install_query_recorder(connection)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_catalog(sender, **kwargs):
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_recipe_fragments(sender, **kwargs):
+    recipe_cache.invalidate_all()
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe(sender, instance, **kwargs):
+    recipe_cache.invalidate_recipes([instance.id])
+
+
+@receiver(post_save, sender=RecipeIngredients)
+@receiver(post_delete, sender=RecipeIngredients)
+def invalidate_recipe_ingredients(sender, instance, **kwargs):
+    recipe_cache.invalidate_recipes([instance.recipe_id])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        recipe_cache.invalidate_recipes([instance.id])
+    elif pk_set:
+        recipe_cache.invalidate_recipes(pk_set)
+    else:
+        recipe_cache.invalidate_all()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_author(sender, instance, **kwargs):
+    recipe_cache.invalidate_users([instance.id])
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def invalidate_token(sender, instance, **kwargs):
+    invalidate_tokens([instance.key])
+
+
+@receiver(post_init, sender=User)
+def remember_is_active(sender, instance, **kwargs):
+    instance.loaded_is_active = instance.__dict__.get('is_active')
+
+
+@receiver(post_save, sender=User)
+def invalidate_token_user(sender, instance, created, **kwargs):
+    if created or instance._password is None and (
+            instance.loaded_is_active == instance.is_active):
+        return
+    instance.loaded_is_active = instance.is_active
+    invalidate_user_tokens([instance.id])
@@ -0,0 +1,526 @@
+import json
+import time
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.cache import caches
+from django.db import connection
+from django.conf import settings
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.test import APIClient
+from rest_framework.throttling import BaseThrottle
+
+from foodgram.generator import generate
+from foodgram.models import (Favorite, Ingredient, Recipe, RecipeIngredients,
+                             ShoppingCart, Tag)
+from users.models import Subscribe, User
+from . import async_views
+from .authentication import get_token_cache, token_cache_key
+from .benchmark import run
+from .db_routers import PIN_COOKIE, ReplicaState, current_state, use_replica
+from .pagination import FeedPagination
+from .renderers import ShoppingListRenderer
+from .views import RecipeViewSet
+from .recipe_cache import (GLOBAL_VERSION_KEY, recipe_cache,
+                           recipe_version_key, user_version_key)
+
+
+class APITestCase(TestCase):
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+
+    def client_for(self, user):
+        token, created = Token.objects.get_or_create(user=user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return client
+
+
+def create_catalog(tags=3, ingredients=4):
+    return (
+        [Tag.objects.create(name=f'Тег {i}', slug=f'tag-{i}',
+                            color=f'#00000{i}') for i in range(tags)],
+        [Ingredient.objects.create(name=f'Ингредиент {i}',
+                                   measurement_unit='г')
+         for i in range(ingredients)],
+    )
+
+
+def create_recipe(author, tags=(), ingredients=(), name='Рецепт'):
+    recipe = Recipe.objects.create(
+        name=name, author=author, text='Текст', cooking_time=1)
+    recipe.tags.set(tags)
+    RecipeIngredients.objects.bulk_create([
+        RecipeIngredients(recipe=recipe, ingredient=ingredient, amount=1)
+        for ingredient in ingredients
+    ])
+    return recipe
+
+
+class QueryBudgetTests(APITestCase):
+    page_sizes = (2, 6)
+
+    @classmethod
+    def setUpTestData(cls):
+        tags, ingredients = create_catalog()
+        cls.user = User.objects.create_user(
+            username='viewer', email='viewer@example.com', password='pass')
+        authors = [
+            User.objects.create_user(
+                username=f'author{i}', email=f'author{i}@example.com',
+                password='pass')
+            for i in range(8)
+        ]
+        for index, author in enumerate(authors):
+            Subscribe.objects.create(user=cls.user, following=author)
+            for number in range(3):
+                recipe = create_recipe(
+                    author, tags[:number + 1], ingredients[:number + 2])
+                if (index + number) % 2:
+                    Favorite.objects.create(user=cls.user, recipe=recipe)
+                    ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+        cls.recipe = recipe
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def count_queries(self, url, page_size):
+        for cache in caches.all():
+            cache.clear()
+        with mock.patch.object(PageNumberPagination, 'page_size', page_size):
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        if 'results' in response.json():
+            self.assertEqual(len(response.json()['results']), page_size)
+        return len(context.captured_queries)
+
+    def assertQueryBudget(self, url, budget):
+        self.assertEqual(
+            [self.count_queries(url, size) for size in self.page_sizes],
+            [budget] * len(self.page_sizes))
+
+    def test_recipe_list(self):
+        # COUNT, страница с флагами зрителя, теги, ингредиенты.
+        self.assertQueryBudget('/api/recipes/', 4)
+
+    def test_recipe_detail(self):
+        # Рецепт с флагами зрителя, теги, ингредиенты.
+        self.assertQueryBudget(f'/api/recipes/{self.recipe.id}/', 3)
+
+    def test_subscriptions(self):
+        # COUNT, страница авторов, последние рецепты авторов, подписки.
+        self.assertQueryBudget('/api/users/subscriptions/', 4)
+
+
+class CachedTokenAuthenticationTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='user', email='user@example.com', password='Pass12345!')
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.client_for(self.user)
+        self.key = Token.objects.get(user=self.user).key
+
+    def test_cached_lookup_skips_database(self):
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/users/me/')
+        self.assertEqual(response.json()['email'], 'user@example.com')
+        fields = dict(get_token_cache().get(token_cache_key(self.key)))
+        self.assertNotIn('password', fields)
+        self.assertNotIn('recipes_count', fields)
+
+    def test_password_change_revokes_cached_token(self):
+        self.client.get('/api/users/me/')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/users/set_password/', {
+                'current_password': 'Pass12345!',
+                'new_password': 'NewPass12345!',
+            })
+        self.assertEqual(response.status_code, 204)
+        self.assertIsNone(get_token_cache().get(token_cache_key(self.key)))
+
+    def test_deactivation_revokes_cached_token(self):
+        self.client.get('/api/users/me/')
+        user = User.objects.get(pk=self.user.pk)
+        user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
+
+    def test_logout_revokes_cached_token(self):
+        self.client.get('/api/users/me/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/auth/token/logout/')
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
+
+    def test_profile_save_does_not_look_up_tokens(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = 'Имя'
+        with self.assertNumQueries(1):
+            user.save()
+
+
+class RecipeCacheTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass')
+        cls.recipe = Recipe.objects.create(
+            name='Рецепт', author=cls.author, text='Текст', cooking_time=1)
+
+    def version_keys(self, recipe):
+        return (GLOBAL_VERSION_KEY, recipe_version_key(recipe.id),
+                user_version_key(recipe.author_id))
+
+    def age_versions(self, recipe):
+        for key in self.version_keys(recipe):
+            written, token = recipe_cache.cache.get(key)
+            recipe_cache.cache.set(key, (written - 60, token), None)
+
+    def get_detail(self):
+        with CaptureQueriesContext(connection) as context:
+            response = APIClient().get(f'/api/recipes/{self.recipe.id}/')
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(context.captured_queries)
+
+    def test_detail_served_from_cache(self):
+        data, cold = self.get_detail()
+        self.age_versions(self.recipe)
+        self.get_detail()
+        cached, warm = self.get_detail()
+        self.assertEqual(cached, data)
+        self.assertLess(warm, cold)
+
+    def test_save_invalidates_cached_fragment(self):
+        self.get_detail()
+        self.age_versions(self.recipe)
+        self.get_detail()
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        recipe.name = 'Новое название'
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.save()
+        self.assertEqual(self.get_detail()[0]['name'], 'Новое название')
+
+    def test_rows_read_before_commit_are_not_cached(self):
+        self.get_detail()
+        self.age_versions(self.recipe)
+        stale = Recipe.objects.get(pk=self.recipe.pk)
+        started = time.time()
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        recipe.name = 'Новое название'
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.save()
+        keys, fragments = recipe_cache.get_many('test', [stale], started)
+        self.assertEqual((keys, fragments), ({stale.id: None}, {}))
+        keys, fragments = recipe_cache.get_many(
+            'test', [stale], started + 60)
+        self.assertIsNotNone(keys[stale.id])
+
+
+class RecipeTagFilterTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tags, ingredients = create_catalog()
+        author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass')
+        first, second, third = cls.tags
+        cls.breakfast = create_recipe(author, [first], name='Завтрак')
+        cls.lunch = create_recipe(author, [first, second], name='Обед')
+        cls.dinner = create_recipe(author, [third], name='Ужин')
+
+    def get_names(self, query):
+        response = APIClient().get(f'/api/recipes/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return sorted(
+            recipe['name'] for recipe in response.json()['results'])
+
+    def test_any_tag(self):
+        self.assertEqual(self.get_names('tags=tag-0&tags=tag-1'),
+                         ['Завтрак', 'Обед'])
+        self.assertEqual(self.get_names('tags=tag-2'), ['Ужин'])
+
+    def test_all_tags(self):
+        self.assertEqual(
+            self.get_names('tags=tag-0&tags=tag-1&tags_mode=all'), ['Обед'])
+
+    def test_unknown_tag_is_rejected(self):
+        response = APIClient().get('/api/recipes/?tags=missing')
+        self.assertEqual(response.status_code, 400)
+
+    def test_new_tag_is_accepted(self):
+        self.get_names('tags=tag-0')
+        tag = Tag.objects.create(name='Новый', slug='new', color='#FFFFFF')
+        self.lunch.tags.add(tag)
+        self.assertEqual(self.get_names('tags=new'), ['Обед'])
+
+
+class RecipeRelationFilterTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='viewer', email='viewer@example.com', password='pass')
+        author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass')
+        cls.favorite = create_recipe(author, name='Избранный')
+        cls.in_cart = create_recipe(author, name='В корзине')
+        create_recipe(author, name='Прочий')
+        Favorite.objects.create(user=cls.user, recipe=cls.favorite)
+        ShoppingCart.objects.create(user=cls.user, recipe=cls.in_cart)
+
+    def get_names(self, query, user=None):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        response = client.get(f'/api/recipes/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return sorted(
+            recipe['name'] for recipe in response.json()['results'])
+
+    def test_is_favorited(self):
+        for value in ('1', 'true'):
+            self.assertEqual(
+                self.get_names(f'is_favorited={value}', self.user),
+                ['Избранный'])
+        for value in ('0', 'false'):
+            self.assertEqual(
+                self.get_names(f'is_favorited={value}', self.user),
+                ['В корзине', 'Прочий'])
+
+    def test_is_in_shopping_cart(self):
+        self.assertEqual(
+            self.get_names('is_in_shopping_cart=1', self.user),
+            ['В корзине'])
+        self.assertEqual(
+            self.get_names('is_in_shopping_cart=0&is_favorited=0', self.user),
+            ['Прочий'])
+
+    def test_anonymous(self):
+        self.assertEqual(self.get_names('is_favorited=1'), [])
+        self.assertEqual(self.get_names('is_in_shopping_cart=0'),
+                         ['В корзине', 'Избранный', 'Прочий'])
+
+
+@override_settings(DATABASE_REPLICAS=['default'])
+class ReplicaRoutingTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='user', email='user@example.com', password='pass')
+        cls.other = User.objects.create_user(
+            username='other', email='other@example.com', password='pass')
+        cls.recipe = create_recipe(cls.other)
+
+    def route_read(self, user, cookies=None):
+        request = RequestFactory().get('/api/recipes/')
+        request.COOKIES.update(cookies or {})
+        drf_request = Request(request)
+        drf_request.user = user
+        state = ReplicaState()
+        token = current_state.set(state)
+        try:
+            use_replica(drf_request)
+        finally:
+            current_state.reset(token)
+        return state.replica
+
+    def write(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post(f'/api/recipes/{self.recipe.id}/favorite/')
+        self.assertEqual(response.status_code, 201)
+        return {PIN_COOKIE: response.cookies[PIN_COOKIE].value}
+
+    def test_reads_use_replica(self):
+        self.assertEqual(self.route_read(self.user), 'default')
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/api/recipes/')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_write_pins_reads_to_primary(self):
+        self.assertIsNone(self.route_read(self.user, self.write()))
+
+    def test_pin_is_bound_to_user(self):
+        self.assertEqual(self.route_read(self.other, self.write()), 'default')
+
+    def test_pin_expires(self):
+        cookies = self.write()
+        with mock.patch('django.core.signing.time.time', return_value=(
+                time.time() + settings.REPLICA_STICKY_SECONDS + 1)):
+            self.assertEqual(self.route_read(self.user, cookies), 'default')
+
+
+class FeedTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='reader', email='reader@example.com', password='pass')
+        cls.authors = [
+            User.objects.create_user(
+                username=f'author{i}', email=f'author{i}@example.com',
+                password='pass')
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_feed(self):
+        ids = []
+        url = '/api/recipes/feed/'
+        with mock.patch.object(FeedPagination, 'page_size', 2):
+            while url:
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                ids += [recipe['id'] for recipe in response.json()['results']]
+                url = response.json()['next']
+        return ids
+
+    def test_feed_follows_subscriptions(self):
+        first, second, stranger = self.authors
+        old = create_recipe(first)
+        Subscribe.objects.create(user=self.user, following=first)
+        Subscribe.objects.create(user=self.user, following=second)
+        recipes = [create_recipe(author)
+                   for author in (second, stranger, first, second, first)]
+        expected = [recipe.id for recipe in reversed(recipes)
+                    if recipe.author != stranger] + [old.id]
+        self.assertEqual(self.get_feed(), expected)
+        Subscribe.objects.filter(user=self.user, following=second).delete()
+        self.assertEqual(self.get_feed(), [
+            recipe.id for recipe in reversed(recipes)
+            if recipe.author == first] + [old.id])
+
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=0)
+    def test_feed_reads_popular_authors_without_fan_out(self):
+        author = self.authors[0]
+        Subscribe.objects.create(user=self.user, following=author)
+        recipes = [create_recipe(author) for _ in range(3)]
+        self.assertFalse(Recipe.objects.filter(in_timelines=True).exists())
+        self.assertEqual(self.get_feed(),
+                         [recipe.id for recipe in reversed(recipes)])
+
+    def test_feed_requires_authentication(self):
+        self.assertEqual(
+            APIClient().get('/api/recipes/feed/').status_code, 401)
+
+
+class BenchmarkBudgetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        generate(seed=0, scale=0.01)
+
+    def test_query_budgets(self):
+        # Время ответа зависит от машины, его проверяет команда benchmark.
+        for result in run(repeat=1):
+            with self.subTest(result.scenario.name):
+                self.assertEqual(result.status, 200)
+                self.assertLessEqual(result.queries,
+                                     result.scenario.max_queries)
+
+
+class ShoppingListDownloadTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        tags, ingredients = create_catalog(ingredients=2)
+        cls.user = User.objects.create_user(
+            username='user', email='user@example.com', password='pass')
+        ShoppingCart.objects.create(
+            user=cls.user, recipe=create_recipe(cls.user, tags, ingredients))
+
+    def download(self, extension, user=None):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        return client.get(
+            f'/api/recipes/download_shopping_cart/?format={extension}')
+
+    def test_formats(self):
+        content = b''.join(self.download('txt', self.user).streaming_content)
+        self.assertEqual(content.decode().splitlines(),
+                         ['Ингредиент 0 - 1 г', 'Ингредиент 1 - 1 г'])
+        content = b''.join(self.download('json', self.user).streaming_content)
+        self.assertEqual(json.loads(content)[0], {
+            'name': 'Ингредиент 0', 'measurement_unit': 'г', 'amount': 1})
+        content = b''.join(self.download('pdf', self.user).streaming_content)
+        self.assertTrue(content.startswith(b'%PDF'))
+
+    def test_errors_are_rendered_as_json(self):
+        for extension in ('txt', 'csv', 'pdf', 'json'):
+            with self.subTest(extension):
+                response = self.download(extension)
+                self.assertEqual(response.status_code, 401)
+                self.assertEqual(response['Content-Type'], 'application/json')
+                self.assertIn('detail', json.loads(response.content))
+
+    def test_render_row_is_abstract(self):
+        class IncompleteRenderer(ShoppingListRenderer):
+            media_type = 'text/plain'
+
+        with self.assertRaises(TypeError):
+            IncompleteRenderer()
+
+
+class DenyThrottle(BaseThrottle):
+
+    def allow_request(self, request, view):
+        return False
+
+
+class AsyncReadViewTests(APITestCase):
+
+    def get(self, view, path, **kwargs):
+        response = async_to_sync(view)(RequestFactory().get(path), **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    def test_permissions_match_sync_view(self):
+        response = self.get(async_views.subscriptions,
+                            '/api/users/subscriptions/')
+        expected = APIClient().get('/api/users/subscriptions/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(json.loads(response.content), expected.json())
+
+    def test_throttles_are_checked(self):
+        with mock.patch.object(RecipeViewSet, 'throttle_classes',
+                               [DenyThrottle]):
+            response = self.get(async_views.recipe_list, '/api/recipes/')
+        self.assertEqual(response.status_code, 429)
+
+
+class MetricsViewTests(TestCase):
+
+    @override_settings(METRICS_TOKEN='')
+    def test_denied_without_configured_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_requires_token(self):
+        self.assertEqual(self.client.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        response = self.client.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
@@ -14,6 +14,7 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from rest_framework import routers
+from django.conf import settings
 from django.urls import include, path
 from djoser.views import UserViewSet as DjoserViewSet
 from .views import (RecipeViewSet, TagViewSet,
@@ -35,7 +36,23 @@ router.register(r'recipes/(?P<recipe_id>\d+)/favorite',
                 FavoriteViewSet, basename='favorite')
 router.register('ingredients', IngredientViewSet, basename='ingredients')
 
-urlpatterns = [
+async_urlpatterns = []
+
+if settings.ASYNC_READ_VIEWS:
+    from . import async_views
+
+    async_urlpatterns = [
+        path('recipes/', async_views.recipe_list, name='recipe-list'),
+        path('recipes/<int:id>/', async_views.recipe_detail,
+             name='recipe-detail'),
+        path('users/subscriptions/', async_views.subscriptions,
+             name='user-subscriptions'),
+        path('ingredients/', async_views.ingredient_list,
+             name='ingredients-list'),
+        path('tags/', async_views.tag_list, name='tag-list'),
+    ]
+
+urlpatterns = async_urlpatterns + [
     path('users/set_password/',
          DjoserViewSet.as_view({'post': 'set_password'})),
     path('', include(router.urls)),
@@ -0,0 +1,95 @@
+from django.db import models
+from rest_framework import serializers
+
+from foodgram.models import Favorite, ShoppingCart
+from users.models import Subscribe
+
+
+class ViewerContext:
+
+    def __init__(self, user=None):
+        self.user = user
+        self.following = set()
+        self.favorites = set()
+        self.shopping_cart = set()
+        self.loaded_users = set()
+        self.loaded_recipes = set()
+
+    @classmethod
+    def from_context(cls, context):
+        request = context.get('request')
+        if request is None:
+            return cls()
+        viewer = getattr(request, 'viewer', None)
+        if viewer is None or viewer.user != request.user:
+            viewer = request.viewer = cls(request.user)
+        return viewer
+
+    @property
+    def is_authenticated(self):
+        return self.user is not None and self.user.is_authenticated
+
+    def load_users(self, user_ids):
+        user_ids = set(user_ids) - self.loaded_users - {None}
+        if not user_ids or not self.is_authenticated:
+            return
+        self.following.update(Subscribe.objects.filter(
+            user=self.user, following__in=user_ids
+        ).values_list('following_id', flat=True))
+        self.loaded_users |= user_ids
+
+    def load_recipes(self, recipe_ids):
+        recipe_ids = set(recipe_ids) - self.loaded_recipes
+        if not recipe_ids or not self.is_authenticated:
+            return
+        self.favorites.update(Favorite.objects.filter(
+            user=self.user, recipe__in=recipe_ids
+        ).values_list('recipe_id', flat=True))
+        self.shopping_cart.update(ShoppingCart.objects.filter(
+            user=self.user, recipe__in=recipe_ids
+        ).values_list('recipe_id', flat=True))
+        self.loaded_recipes |= recipe_ids
+
+    def is_subscribed(self, user):
+        if not self.is_authenticated:
+            return False
+        if hasattr(user, 'is_subscribed'):
+            return user.is_subscribed
+        self.load_users([user.id])
+        return user.id in self.following
+
+    def is_favorited(self, recipe):
+        if not self.is_authenticated:
+            return False
+        if hasattr(recipe, 'is_favorited'):
+            return recipe.is_favorited
+        self.load_recipes([recipe.id])
+        return recipe.id in self.favorites
+
+    def is_in_shopping_cart(self, recipe):
+        if not self.is_authenticated:
+            return False
+        if hasattr(recipe, 'is_in_shopping_cart'):
+            return recipe.is_in_shopping_cart
+        self.load_recipes([recipe.id])
+        return recipe.id in self.shopping_cart
+
+
+class ViewerListSerializer(serializers.ListSerializer):
+
+    def to_representation(self, data):
+        if isinstance(data, models.Manager):
+            data = data.all()
+        data = list(data)
+        self.child.preload(data)
+        return super().to_representation(data)
+
+
+class ViewerSerializerMixin:
+
+    @property
+    def viewer(self):
+        return ViewerContext.from_context(self.context)
+
+    def preload(self, instances):
+        pass
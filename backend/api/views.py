@@ -1,5 +1,9 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from rest_framework.permissions import SAFE_METHODS
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
@@ -9,8 +13,9 @@ from rest_framework.decorators import action
 from rest_framework import permissions, filters
 from djoser.views import UserViewSet
 
-from foodgram.models import (Ingredient, Tag, Recipe,
-                             ShoppingCart, Favorite, RecipeIngredients)
+from foodgram.models import (Ingredient, Tag, Recipe, ShoppingCart,
+                             ShoppingCartIngredient, Favorite,
+                             RecipeIngredients)
 from users.models import User, Subscribe
 from .serializers import (TagSerializer, IngredientSerializer,
                           UserSerializer, FavoriteSerializer,
@@ -18,7 +23,14 @@ from .serializers import (TagSerializer, IngredientSerializer,
 from .serializers import (GetRecipeSerializer, PostRecipeSerializer,
                           SubscribeSerializer, ShoppingCartSerializer,
                           SubscriptionSerializer)
+from .caching import CatalogCacheMixin
+from .db_routers import ReplicaReadMixin
+from .recipe_cache import RecipeCacheMixin
 from .filters import IngredientFilter, RecipeFilter
+from .pagination import FeedPagination, RecipePagination
+from .ingredient_index import fuzzy_search, ingredient_index
+from .renderers import (CSVShoppingListRenderer, JSONShoppingListRenderer,
+                        PDFShoppingListRenderer, TextShoppingListRenderer)
 
 
 class ShoppingCartViewSet(viewsets.ModelViewSet):
@@ -29,6 +41,7 @@ class ShoppingCartViewSet(viewsets.ModelViewSet):
     filter_backends = [filters.SearchFilter]
     search_fields = ['=name', ]
 
+    @transaction.atomic
     def create(self, serializer, recipe_id):
         recipe = get_object_or_404(Recipe, id=recipe_id)
         shopping_cart = ShoppingCart.objects.create(
@@ -36,6 +49,7 @@ class ShoppingCartViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(shopping_cart)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @transaction.atomic
     def delete(self, request, recipe_id):
         user = request.user
         recipe = get_object_or_404(Recipe, id=recipe_id)
@@ -43,7 +57,8 @@ class ShoppingCartViewSet(viewsets.ModelViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class IngredientViewSet(viewsets.ModelViewSet):
+class IngredientViewSet(ReplicaReadMixin, CatalogCacheMixin,
+                        viewsets.ModelViewSet):
     permission_classes = [permissions.AllowAny]
     lookup_field = 'id'
     queryset = Ingredient.objects.all()
@@ -52,6 +67,17 @@ class IngredientViewSet(viewsets.ModelViewSet):
     filterset_class = IngredientFilter
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        return self.catalog_response(self.search, request)
+
+    def search(self, request):
+        name = request.query_params.get('name', '')
+        limit = settings.INGREDIENT_SEARCH_LIMIT if name else None
+        ingredients = ingredient_index.search(name, limit)
+        if name and not ingredients:
+            ingredients = fuzzy_search(name, limit)
+        return Response(ingredients)
+
 
 class RecipeIngredientsViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, ]
@@ -62,7 +88,7 @@ class RecipeIngredientsViewSet(viewsets.ModelViewSet):
     filterset_class = RecipeFilter
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(ReplicaReadMixin, CatalogCacheMixin, viewsets.ModelViewSet):
 
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
@@ -70,12 +96,20 @@ class TagViewSet(viewsets.ModelViewSet):
     pagination_class = None
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(RecipeCacheMixin, ReplicaReadMixin,
+                    viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, ]
     lookup_field = 'id'
     queryset = Recipe.objects.all()
     filter_backends = (DjangoFilterBackend, )
     filterset_class = RecipeFilter
+    pagination_class = RecipePagination
+
+    def get_queryset(self):
+        if self.request.method in SAFE_METHODS:
+            return Recipe.objects.select_related('author').with_user_flags(
+                self.request.user)
+        return Recipe.objects.all()
 
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
@@ -89,40 +123,62 @@ class RecipeViewSet(viewsets.ModelViewSet):
         permission_classes=(permissions.IsAuthenticated,)
     )
     def favorites(self, request):
-        queryset = Recipe.objects.filter(
+        queryset = self.get_queryset().filter(
             in_favorite__user=request.user.id)
         page = self.paginate_queryset(queryset)
         serializer = GetRecipeSerializer(page,
                                          context={'request': request},
                                          many=True)
-        return self.response(serializer.data)
+        return self.get_paginated_response(serializer.data)
 
     @action(
         detail=False,
         methods=['get', ],
         permission_classes=(permissions.IsAuthenticated,)
     )
+    def feed(self, request):
+        paginator = FeedPagination()
+        ids = paginator.paginate_feed(request, request.user)
+        recipes = self.get_queryset().in_bulk(ids)
+        serializer = GetRecipeSerializer([recipes[pk] for pk in ids
+                                          if pk in recipes],
+                                         context={'request': request},
+                                         many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=['get', ],
+        permission_classes=(permissions.IsAuthenticated,),
+        renderer_classes=(TextShoppingListRenderer, CSVShoppingListRenderer,
+                          PDFShoppingListRenderer, JSONShoppingListRenderer)
+    )
     def download_shopping_cart(self, request):
-        ingredients_list = Recipe.objects.filter(
-            in_shopping_list__user=request.user
-        ).values(
-            'ingredients__name',
-            'ingredients__measurement_unit'
-        ).annotate(amount=Sum('ingredient_recipes__amount'))
-        shopping_list = []
-        for ingredient in ingredients_list:
-            shopping_list.append(
-                f'{ingredient["ingredients__name"]} - {ingredient["amount"]}'
-                f'{ingredient["ingredients__measurement_unit"]} \n')
-
-        response = HttpResponse(shopping_list,
-                                'Content-Type: text/plain')
-        response['Content-Disposition'] = ('attachment; '
-                                           'filename="shopping_list.txt"')
+        ingredients = ShoppingCartIngredient.objects.filter(
+            user=request.user
+        ).values_list(
+            'ingredient__name',
+            'ingredient__measurement_unit',
+            'amount'
+        ).order_by('ingredient__name')
+        rows = ingredients.iterator()
+        if isinstance(request._request, ASGIRequest):
+            # Под ASGI потоковый ответ читается в цикле событий, где ORM
+            # недоступна, поэтому строки загружаются заранее.
+            rows = list(ingredients)
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(rows),
+            content_type=renderer.content_type
+        )
+        response['Content-Disposition'] = (
+            'attachment; '
+            f'filename="shopping_list.{renderer.format}"'
+        )
         return response
 
 
-class CustomUserViewSet(UserViewSet):
+class CustomUserViewSet(RecipeCacheMixin, ReplicaReadMixin, UserViewSet):
     permission_classes = [permissions.AllowAny, ]
     queryset = User.objects.all()
     serializer_class = UserSerializer
@@ -145,12 +201,34 @@ class CustomUserViewSet(UserViewSet):
         permission_classes=(permissions.IsAuthenticated,)
     )
     def subscriptions(self, request):
-        queryset = User.objects.filter(following__user=request.user.id)
-        page = self.paginate_queryset(queryset)
+        page = self.paginate_queryset(self.get_subscriptions())
+        recipes = defaultdict(list)
+        for recipe in self.get_latest_recipes(page):
+            recipes[recipe.author_id].append(recipe)
         serializer = SubscriptionSerializer(page, many=True,
-                                            context={'request': request})
+                                            context={'request': request,
+                                                     'recipes': recipes})
         return self.get_paginated_response(serializer.data)
 
+    def get_subscriptions(self):
+        return User.objects.filter(
+            following__user=self.request.user.id
+        ).order_by('id')
+
+    def get_latest_recipes(self, authors):
+        return Recipe.objects.latest_per_author(
+            authors, self.get_recipes_limit()
+        ).only('id', 'name', 'image', 'image_variants', 'cooking_time',
+               'author')
+
+    def get_recipes_limit(self):
+        recipes_limit = self.request.query_params.get('recipes_limit')
+        try:
+            recipes_limit = int(recipes_limit)
+        except (TypeError, ValueError):
+            return settings.SUBSCRIPTION_RECIPES_LIMIT
+        return max(recipes_limit, 0)
+
 
 class FavoriteViewSet(viewsets.ModelViewSet):
     serializer_class = FavoriteSerializer
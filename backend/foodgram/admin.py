@@ -1,6 +1,7 @@
 from django.contrib import admin
 from .models import (Ingredient, Recipe, RecipeIngredients,
-                     ShoppingCart, Favorite, Tag)
+                     ShoppingCart, ShoppingCartIngredient, Favorite, Tag,
+                     TimelineEntry)
 
 admin.site.register(Tag)
 admin.site.register(Ingredient)
@@ -8,3 +9,5 @@ admin.site.register(Recipe)
 admin.site.register(RecipeIngredients)
 admin.site.register(Favorite)
 admin.site.register(ShoppingCart)
+admin.site.register(ShoppingCartIngredient)
+admin.site.register(TimelineEntry)
@@ -0,0 +1,79 @@
+from django.apps import apps as global_apps
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+COUNTERS = (
+    ('users.User', 'recipes_count', 'foodgram.Recipe', 'author'),
+    ('users.User', 'followers_count', 'users.Subscribe', 'following'),
+    ('foodgram.Recipe', 'favorites_count', 'foodgram.Favorite', 'recipe'),
+    ('foodgram.Recipe', 'shopping_cart_count',
+     'foodgram.ShoppingCart', 'recipe'),
+)
+
+
+def counter_fields(model):
+    return {
+        counter for label, counter, related, field in COUNTERS
+        if label == model._meta.label
+    }
+
+
+class DenormalizedFieldsMixin:
+    """Не даёт полному save() затереть поля, которые ведут сигналы."""
+
+    denormalized_fields = ()
+
+    def save(self, force_insert=False, force_update=False, using=None,
+             update_fields=None):
+        if update_fields is None and not force_insert and not (
+                self._state.adding):
+            skipped = self.get_deferred_fields()
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.denormalized_fields
+                and field.attname not in skipped
+            ]
+        super().save(force_insert, force_update, using, update_fields)
+
+
+def adjust(instance, delta):
+    label = instance._meta.label
+    for model, counter, related, field in COUNTERS:
+        if related != label:
+            continue
+        pk = getattr(instance, f'{field}_id')
+        if pk is not None:
+            global_apps.get_model(model).objects.filter(pk=pk).update(
+                **{counter: F(counter) + delta})
+
+
+def actual_count(apps, related, field):
+    return Coalesce(Subquery(
+        apps.get_model(related).objects.filter(
+            **{field: OuterRef('pk')}
+        ).order_by().values(field).annotate(
+            count=Count('pk')
+        ).values('count')
+    ), 0)
+
+
+def find_drift(apps=global_apps):
+    for model, counter, related, field in COUNTERS:
+        rows = apps.get_model(model).objects.annotate(
+            actual=actual_count(apps, related, field)
+        ).filter(~Q(**{counter: F('actual')})).values_list(
+            'pk', counter, 'actual')
+        for pk, stored, actual in rows.iterator():
+            yield model, counter, pk, stored, actual
+
+
+def reconcile(apps=global_apps):
+    fixed = 0
+    for model, counter, related, field in COUNTERS:
+        queryset = apps.get_model(model).objects.all()
+        fixed += queryset.annotate(
+            actual=actual_count(apps, related, field)
+        ).filter(~Q(**{counter: F('actual')})).count()
+        queryset.update(**{counter: actual_count(apps, related, field)})
+    return fixed
@@ -0,0 +1,254 @@
+import datetime as dt
+import io
+import multiprocessing
+import random
+from itertools import accumulate
+
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+
+from users.models import Subscribe, User
+from . import timelines
+from .counters import reconcile
+from .models import (Favorite, Ingredient, Recipe, RecipeIngredients,
+                     ShoppingCart, ShoppingCartIngredient, Tag)
+
+worker_plan = None
+
+EPOCH = dt.datetime(2020, 1, 1, tzinfo=dt.timezone.utc)
+WORDS = (
+    'суп', 'салат', 'пирог', 'каша', 'рагу', 'запеканка', 'омлет', 'борщ',
+    'плов', 'паста', 'рыба', 'курица', 'говядина', 'овощи', 'грибы', 'сыр',
+)
+
+
+class PowerLaw:
+
+    def __init__(self, items, exponent):
+        self.items = items
+        self.cum_weights = list(accumulate(
+            1 / rank ** exponent for rank in range(1, len(items) + 1)))
+
+    def sample(self, rng, k=1):
+        return rng.choices(self.items, cum_weights=self.cum_weights, k=k)
+
+
+def chunk_rng(seed, name, index):
+    return random.Random(f'{seed}:{name}:{index}')
+
+
+def copy_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if hasattr(value, 'adapted'):
+        value = value.dumps(value.adapted)
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace(
+        '\n', '\\n').replace('\r', '\\r')
+
+
+def insert(model, objects):
+    fields = [
+        field for field in model._meta.concrete_fields
+        if not (field.primary_key and objects
+                and getattr(objects[0], field.attname) is None)
+    ]
+    rows = [
+        [field.get_db_prep_save(getattr(obj, field.attname), connection)
+         for field in fields]
+        for obj in objects
+    ]
+    table = connection.ops.quote_name(model._meta.db_table)
+    columns = ', '.join(
+        connection.ops.quote_name(field.column) for field in fields)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            buffer = io.StringIO()
+            for row in rows:
+                buffer.write('\t'.join(map(copy_value, row)) + '\n')
+            buffer.seek(0)
+            cursor.copy_expert(
+                f'COPY {table} ({columns}) FROM STDIN', buffer)
+        else:
+            placeholders = ', '.join(['%s'] * len(fields))
+            cursor.executemany(
+                f'INSERT INTO {table} ({columns}) VALUES ({placeholders})',
+                rows)
+
+
+class Plan:
+
+    def __init__(self, seed, scale, first_user, first_recipe,
+                 tag_ids, ingredient_ids, chunk_size=10000):
+        self.seed = seed
+        self.users = max(int(1000 * scale), 2)
+        self.recipes = max(int(10000 * scale), 1)
+        self.first_user = first_user
+        self.first_recipe = first_recipe
+        self.tag_ids = tag_ids
+        self.ingredient_ids = ingredient_ids
+        self.chunk_size = chunk_size
+        rng = random.Random(f'{seed}:popularity')
+        authors = list(range(first_user, first_user + self.users))
+        rng.shuffle(authors)
+        self.authors = PowerLaw(authors, 1.1)
+        recipes = list(range(first_recipe, first_recipe + self.recipes))
+        rng.shuffle(recipes)
+        self.popular_recipes = PowerLaw(recipes, 1.0)
+
+    def chunks(self, total):
+        return [
+            (start, min(start + self.chunk_size, total))
+            for start in range(0, total, self.chunk_size)
+        ]
+
+    def user_tasks(self):
+        return [('users', chunk) for chunk in self.chunks(self.users)]
+
+    def recipe_tasks(self):
+        return [('recipes', chunk) for chunk in self.chunks(self.recipes)]
+
+    def relation_tasks(self):
+        return [('relations', chunk) for chunk in self.chunks(self.users)]
+
+    def run(self, task):
+        name, (start, stop) = task
+        rng = chunk_rng(self.seed, name, start)
+        with transaction.atomic():
+            getattr(self, f'generate_{name}')(rng, start, stop)
+        return name, stop - start
+
+    def generate_users(self, rng, start, stop):
+        insert(User, [
+            User(id=user_id, username=f'load{self.seed}_{user_id}',
+                 email=f'load{self.seed}_{user_id}@example.com',
+                 first_name=rng.choice(('Анна', 'Иван', 'Мария', 'Олег')),
+                 last_name=f'Пользователь {i}', password='!',
+                 date_joined=EPOCH + dt.timedelta(minutes=i))
+            for i, user_id in zip(range(start, stop), range(
+                self.first_user + start, self.first_user + stop))
+        ])
+
+    def generate_recipes(self, rng, start, stop):
+        authors = self.authors.sample(rng, stop - start)
+        insert(Recipe, [
+            Recipe(id=self.first_recipe + i, author_id=author_id,
+                   name=' '.join(rng.sample(WORDS, 2)).capitalize(),
+                   text=' '.join(rng.choices(WORDS, k=rng.randint(10, 60))),
+                   cooking_time=rng.randint(5, 180), image_variants={},
+                   pub_date=EPOCH + dt.timedelta(minutes=10 * i))
+            for i, author_id in zip(range(start, stop), authors)
+        ])
+        recipe_ids = range(self.first_recipe + start,
+                           self.first_recipe + stop)
+        insert(Recipe.tags.through, [
+            Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in rng.sample(
+                self.tag_ids, min(rng.randint(1, 3), len(self.tag_ids)))
+        ])
+        insert(RecipeIngredients, [
+            RecipeIngredients(recipe_id=recipe_id,
+                              ingredient_id=ingredient_id,
+                              amount=rng.randint(1, 1000))
+            for recipe_id in recipe_ids
+            for ingredient_id in rng.sample(
+                self.ingredient_ids,
+                min(rng.randint(3, 12), len(self.ingredient_ids)))
+        ])
+        Recipe.objects.filter(id__in=recipe_ids).update_search_index()
+
+    def sample_unique(self, rng, law, mean, exclude=None):
+        count = min(int(mean * rng.paretovariate(1.5) / 3),
+                    len(law.items) - 1)
+        return set(law.sample(rng, count)) - {exclude}
+
+    def generate_relations(self, rng, start, stop):
+        favorites, carts, subscriptions = [], [], []
+        for user_id in range(self.first_user + start,
+                             self.first_user + stop):
+            favorites.extend(
+                Favorite(user_id=user_id, recipe_id=recipe_id)
+                for recipe_id in sorted(self.sample_unique(
+                    rng, self.popular_recipes, 20)))
+            carts.extend(
+                ShoppingCart(user_id=user_id, recipe_id=recipe_id)
+                for recipe_id in sorted(self.sample_unique(
+                    rng, self.popular_recipes, 3)))
+            subscriptions.extend(
+                Subscribe(user_id=user_id, following_id=following_id)
+                for following_id in sorted(self.sample_unique(
+                    rng, self.authors, 5, exclude=user_id)))
+        insert(Favorite, favorites)
+        insert(ShoppingCart, carts)
+        insert(Subscribe, subscriptions)
+
+
+def prepare_catalog(tags=20, ingredients=2000):
+    existing_tags = Tag.objects.count()
+    Tag.objects.bulk_create([
+        Tag(name=f'Тег {i}', slug=f'tag-{i}', color=f'#{i:06X}')
+        for i in range(existing_tags, tags)
+    ])
+    existing_ingredients = Ingredient.objects.count()
+    Ingredient.objects.bulk_create([
+        Ingredient(name=f'ингредиент {i}', measurement_unit='г')
+        for i in range(existing_ingredients, ingredients)
+    ], batch_size=1000, ignore_conflicts=True)
+    return (
+        sorted(Tag.objects.values_list('id', flat=True)),
+        sorted(Ingredient.objects.values_list('id', flat=True)),
+    )
+
+
+def next_id(model):
+    last = model.objects.order_by('-id').values_list('id', flat=True).first()
+    return (last or 0) + 1
+
+
+def reset_sequences():
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(
+                no_style(), [User, Recipe]):
+            cursor.execute(sql)
+
+
+def init_worker(plan):
+    global worker_plan
+    connections.close_all()
+    worker_plan = plan
+
+
+def run_task(task):
+    return worker_plan.run(task)
+
+
+def generate(seed=0, scale=1.0, processes=1, chunk_size=10000,
+             report=None):
+    if connection.vendor == 'sqlite':
+        processes = 1
+    tag_ids, ingredient_ids = prepare_catalog()
+    plan = Plan(seed, scale, next_id(User), next_id(Recipe), tag_ids,
+                ingredient_ids, chunk_size)
+    stages = (plan.user_tasks(), plan.recipe_tasks(), plan.relation_tasks())
+    if processes > 1:
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        with context.Pool(processes, init_worker, (plan,)) as pool:
+            for tasks in stages:
+                for result in pool.imap(run_task, tasks):
+                    if report:
+                        report(*result)
+    else:
+        init_worker(plan)
+        for tasks in stages:
+            for result in map(run_task, tasks):
+                if report:
+                    report(*result)
+    reset_sequences()
+    reconcile()
+    timelines.rebuild()
+    ShoppingCartIngredient.objects.rebuild(
+        list(range(plan.first_user, plan.first_user + plan.users)))
+    return plan
@@ -0,0 +1,84 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+VARIANT_FORMATS = {'webp': 'WEBP', 'jpg': 'JPEG'}
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.RECIPE_IMAGE_WORKERS,
+    thread_name_prefix='recipe-images'
+)
+
+
+def variant_name(image_name, variant, extension):
+    stem = os.path.splitext(image_name)[0]
+    return f'{stem}/{variant}.{extension}'
+
+
+def render_variant(image, size, image_format):
+    variant = image.copy()
+    variant.thumbnail(size)
+    if image_format == 'JPEG' and variant.mode != 'RGB':
+        variant = variant.convert('RGB')
+    output = BytesIO()
+    variant.save(output, image_format, quality=settings.RECIPE_IMAGE_QUALITY)
+    return ContentFile(output.getvalue())
+
+
+def generate_variants(recipe):
+    storage = recipe.image.storage
+    variants = {}
+    with recipe.image.open('rb') as original:
+        with Image.open(original) as image:
+            image.draft('RGB', max(settings.RECIPE_IMAGE_VARIANTS.values()))
+            image.load()
+            for variant, size in settings.RECIPE_IMAGE_VARIANTS.items():
+                variants[variant] = {}
+                for extension, image_format in VARIANT_FORMATS.items():
+                    variants[variant][extension] = storage.save(
+                        variant_name(recipe.image.name, variant, extension),
+                        render_variant(image, size, image_format))
+    return variants
+
+
+def process_recipe_image(recipe_id):
+    from .models import Recipe
+
+    recipe = Recipe.objects.filter(id=recipe_id).first()
+    if recipe is None or not recipe.image:
+        return
+    image_name = recipe.image.name
+    variants = generate_variants(recipe)
+    with transaction.atomic():
+        recipe = Recipe.objects.select_for_update().filter(
+            id=recipe_id, image=image_name).first()
+        if recipe is not None:
+            recipe.image_variants = variants
+            recipe.save(update_fields=['image_variants'])
+
+
+def process_in_background(recipe_id):
+    close_old_connections()
+    try:
+        process_recipe_image(recipe_id)
+    except Exception:
+        logger.exception('Не удалось обработать изображение рецепта %s',
+                         recipe_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_image_processing(recipe):
+    if settings.RECIPE_IMAGE_ASYNC:
+        transaction.on_commit(
+            lambda: executor.submit(process_in_background, recipe.id))
+    else:
+        transaction.on_commit(lambda: process_recipe_image(recipe.id))
@@ -0,0 +1,76 @@
+import csv
+import json
+
+from .models import Ingredient
+
+HEADER = ('name', 'measurement_unit')
+JSON_SEPARATORS = ' \t\r\n[],'
+
+
+def iter_csv(stream):
+    for row in csv.reader(stream):
+        if not row or tuple(cell.strip() for cell in row[:2]) == HEADER:
+            continue
+        yield row[0], row[1] if len(row) > 1 else ''
+
+
+def iter_json(stream, chunk_size=64 * 1024):
+    decoder = json.JSONDecoder()
+    buffer = ''
+    eof = False
+    while True:
+        buffer = buffer.lstrip(JSON_SEPARATORS)
+        if not buffer:
+            if eof:
+                return
+            buffer = stream.read(chunk_size)
+            eof = not buffer
+            continue
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = stream.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+        buffer = buffer[end:]
+        yield item['name'], item['measurement_unit']
+
+
+def iter_batches(rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def clean_row(name, measurement_unit):
+    name, measurement_unit = name.strip(), measurement_unit.strip()
+    max_length = Ingredient._meta.get_field('name').max_length
+    if not name or not measurement_unit:
+        raise ValueError('Пустое название или единица измерения')
+    if len(name) > max_length or len(measurement_unit) > max_length:
+        raise ValueError(f'Длина значения больше {max_length} символов')
+    return name, measurement_unit
+
+
+def upsert_ingredients(batch):
+    keys = dict.fromkeys(batch)
+    matching = Ingredient.objects.filter(
+        name__in={name for name, measurement_unit in keys})
+    existing = set(matching.values_list('name', 'measurement_unit'))
+    missing = [
+        Ingredient(name=name, measurement_unit=measurement_unit)
+        for name, measurement_unit in keys
+        if (name, measurement_unit) not in existing
+    ]
+    if not missing:
+        return 0
+    Ingredient.objects.bulk_create(missing, ignore_conflicts=True)
+    return matching.count() - len(existing)
@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (setup_test_environment,
+                               teardown_test_environment)
+
+from api.benchmark import SCENARIOS, run
+from foodgram.generator import generate
+
+
+class Command(BaseCommand):
+    help = ('Замеряет время ответа, число SQL-запросов и размер ответа '
+            'для эндпоинтов API на тестовой базе')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Количество замеров на эндпоинт'
+        )
+        parser.add_argument(
+            '--scale', type=float, default=0.05,
+            help='Масштаб тестовых данных (см. generate_data)'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Зерно генератора тестовых данных'
+        )
+        parser.add_argument(
+            '--only', action='append', choices=[s.name for s in SCENARIOS],
+            help='Запустить только указанный сценарий'
+        )
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='Не удалять тестовую базу после запуска'
+        )
+
+    def handle(self, *args, **options):
+        scenarios = [
+            scenario for scenario in SCENARIOS
+            if not options['only'] or scenario.name in options['only']
+        ]
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            generate(options['seed'], options['scale'])
+            results = run(options['repeat'], scenarios)
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+        self.stdout.write(
+            f'{"сценарий":<22}{"код":>5}{"запросы":>9}{"байт":>10}'
+            f'{"медиана, мс":>13}{"макс, мс":>10}'
+        )
+        failed = []
+        for result in results:
+            failures = result.failures
+            line = (
+                f'{result.scenario.name:<22}{result.status:>5}'
+                f'{result.queries:>5}/{result.scenario.max_queries:<3}'
+                f'{result.size:>10}{result.median_ms:>13.1f}'
+                f'{result.max_ms:>10.1f}'
+            )
+            if failures:
+                failed.append(f'{result.scenario.name}: {", ".join(failures)}')
+                line = self.style.ERROR(line)
+            self.stdout.write(line)
+        if failed:
+            raise CommandError('Превышены бюджеты:\n' + '\n'.join(failed))
+        self.stdout.write(self.style.SUCCESS('Все бюджеты соблюдены'))
@@ -0,0 +1,101 @@
+import io
+import os
+import sys
+import time
+from contextlib import nullcontext
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from foodgram.importers import (clean_row, iter_batches, iter_csv, iter_json,
+                                upsert_ingredients)
+
+from api.caching import bump_catalog_version
+
+READERS = {
+    'csv': iter_csv,
+    'json': iter_json,
+}
+
+
+class Command(BaseCommand):
+    help = 'Загружает ингредиенты из CSV или JSON без создания дубликатов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='data/ingredients.csv',
+            help='Путь к файлу или "-" для чтения из stdin'
+        )
+        parser.add_argument(
+            '--format', choices=READERS,
+            help='Формат данных (по умолчанию определяется по расширению)'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Количество строк в одной пачке'
+        )
+        parser.add_argument(
+            '--skip', type=int, default=0,
+            help='Пропустить первые N строк (для продолжения загрузки)'
+        )
+        parser.add_argument(
+            '--atomic', action='store_true',
+            help='Загрузить всё в одной транзакции'
+        )
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        path = options['path']
+        data_format = options['format']
+        if data_format is None:
+            extension = os.path.splitext(path)[1].lstrip('.').lower()
+            data_format = extension if extension in READERS else 'csv'
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля')
+        if path == '-':
+            stream = nullcontext(
+                io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8'))
+        else:
+            try:
+                stream = open(path, encoding='utf-8', newline='')
+            except OSError as error:
+                raise CommandError(f'Не удалось открыть {path}: {error}')
+        with stream as file:
+            rows = islice(READERS[data_format](file), options['skip'], None)
+            with transaction.atomic() if options['atomic'] else nullcontext():
+                self.load(rows, options['batch_size'], options['skip'])
+
+    def load(self, rows, batch_size, skipped):
+        processed = skipped
+        created = 0
+        started = time.monotonic()
+        try:
+            for batch in iter_batches(rows, batch_size):
+                cleaned = []
+                for offset, row in enumerate(batch, processed + 1):
+                    try:
+                        cleaned.append(clean_row(*row))
+                    except ValueError as error:
+                        raise CommandError(f'Строка {offset}: {error}')
+                with transaction.atomic():
+                    created += upsert_ingredients(cleaned)
+                processed += len(batch)
+                self.report(processed, created, processed - skipped, started)
+        except (KeyError, TypeError, ValueError) as error:
+            raise CommandError(
+                f'Некорректные данные после строки {processed}: {error!r}')
+        finally:
+            if created:
+                bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: обработано {processed}, добавлено {created}'))
+
+    def report(self, processed, created, loaded, started):
+        if self.verbosity < 1:
+            return
+        elapsed = time.monotonic() - started
+        rate = loaded / elapsed if elapsed else 0
+        self.stderr.write(
+            f'Обработано {processed}, добавлено {created}, '
+            f'{rate:.0f} строк/с'
+        )
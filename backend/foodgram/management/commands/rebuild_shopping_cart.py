@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from foodgram.models import ShoppingCartIngredient
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сводный список покупок пользователей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true',
+            help='Только сравнить сохранённые суммы с рассчитанными'
+        )
+        parser.add_argument(
+            '--user', type=int, action='append', dest='users',
+            help='id пользователя (можно указать несколько раз)'
+        )
+
+    def handle(self, *args, **options):
+        users = options['users']
+        if options['verify']:
+            expected = ShoppingCartIngredient.objects.expected_totals(users)
+            stored = ShoppingCartIngredient.objects.stored_totals(users)
+            drift = {
+                key for key in expected.keys() | stored.keys()
+                if expected.get(key) != stored.get(key)
+            }
+            for user_id, ingredient_id in sorted(drift):
+                self.stdout.write(
+                    f'user={user_id} ingredient={ingredient_id}: '
+                    f'{stored.get((user_id, ingredient_id), 0)} != '
+                    f'{expected.get((user_id, ingredient_id), 0)}'
+                )
+            if drift:
+                raise CommandError(f'Расхождений: {len(drift)}')
+            self.stdout.write(self.style.SUCCESS('Расхождений нет'))
+            return
+        with transaction.atomic():
+            count = ShoppingCartIngredient.objects.rebuild(users)
+        self.stdout.write(self.style.SUCCESS(f'Записей пересчитано: {count}'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from foodgram.counters import find_drift, reconcile
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики рецептов, подписчиков и избранного'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true',
+            help='Только сравнить сохранённые счётчики с рассчитанными'
+        )
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            drift = 0
+            for model, counter, pk, stored, actual in find_drift():
+                drift += 1
+                self.stdout.write(
+                    f'{model} id={pk} {counter}: {stored} != {actual}')
+            if drift:
+                raise CommandError(f'Расхождений: {drift}')
+            self.stdout.write(self.style.SUCCESS('Расхождений нет'))
+            return
+        with transaction.atomic():
+            count = reconcile()
+        self.stdout.write(self.style.SUCCESS(f'Счётчиков исправлено: {count}'))
@@ -0,0 +1,46 @@
+# Generated by Django 3.2.3 on 2026-10-18 02:28
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+COUNTERS = (
+    ('users.User', 'recipes_count', 'foodgram.Recipe', 'author'),
+    ('users.User', 'followers_count', 'users.Subscribe', 'following'),
+    ('foodgram.Recipe', 'favorites_count', 'foodgram.Favorite', 'recipe'),
+    ('foodgram.Recipe', 'shopping_cart_count',
+     'foodgram.ShoppingCart', 'recipe'),
+)
+
+
+def fill_counters(apps, schema_editor):
+    for model, counter, related, field in COUNTERS:
+        apps.get_model(model).objects.update(**{counter: Coalesce(Subquery(
+            apps.get_model(related).objects.filter(
+                **{field: OuterRef('pk')}
+            ).order_by().values(field).annotate(
+                count=Count('pk')
+            ).values('count')
+        ), 0)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0006_recipe_image_variants'),
+        ('users', '0003_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Добавлений в избранное'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='shopping_cart_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Добавлений в список покупок'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 3.2.3 on 2026-10-18 02:29
+
+from django.conf import settings
+import django.contrib.postgres.search
+from django.db import migrations
+
+INDEX_NAME = 'foodgram_recipe_search_vector_gin'
+FTS_TABLE = 'foodgram_recipe_fts'
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {INDEX_NAME} '
+            'ON foodgram_recipe USING gin (search_vector)'
+        )
+        schema_editor.execute(
+            'UPDATE foodgram_recipe SET search_vector = '
+            "setweight(to_tsvector(%s::regconfig, coalesce(name, '')), 'A')"
+            " || setweight(to_tsvector(%s::regconfig, coalesce(text, '')), "
+            "'B')",
+            (settings.RECIPE_SEARCH_CONFIG, settings.RECIPE_SEARCH_CONFIG)
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} '
+            "USING fts5(name, text, tokenize='unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, text) '
+            'SELECT id, name, text FROM foodgram_recipe'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+    elif vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0007_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
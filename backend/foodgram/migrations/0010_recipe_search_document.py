@@ -0,0 +1,41 @@
+# Generated by Django 3.2.3 on 2026-10-18 02:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+import foodgram.search
+
+FTS_TABLE = 'foodgram_recipe_fts'
+
+
+def set_rank_weights(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        f'INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rank) '
+        "VALUES ('rank', 'bm25(10.0, 1.0)')"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0009_ingredient_name_unit_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSearchDocument',
+            fields=[
+                ('recipe', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_document', serialize=False, to='foodgram.recipe')),
+                ('name', models.TextField()),
+                ('text', models.TextField()),
+                ('document', foodgram.search.FullTextField(db_column='foodgram_recipe_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'foodgram_recipe_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(set_rank_weights, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 3.2.3 on 2026-10-18 02:46
+
+from itertools import islice
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Q
+
+
+def fill_timelines(apps, schema_editor):
+    Recipe = apps.get_model('foodgram', 'Recipe')
+    TimelineEntry = apps.get_model('foodgram', 'TimelineEntry')
+    fanned_out = Q(
+        author__followers_count__lte=settings.FEED_FANOUT_MAX_FOLLOWERS)
+    Recipe.objects.exclude(fanned_out).update(in_timelines=False)
+    Recipe.objects.filter(fanned_out).update(in_timelines=True)
+    rows = apps.get_model('users', 'Subscribe').objects.filter(
+        user__isnull=False, following__recipes__in_timelines=True
+    ).values_list(
+        'user', 'following', 'following__recipes',
+        'following__recipes__pub_date'
+    ).iterator()
+    while True:
+        batch = [
+            TimelineEntry(user_id=user_id, author_id=author_id,
+                          recipe_id=recipe_id, pub_date=pub_date)
+            for user_id, author_id, recipe_id, pub_date
+            in islice(rows, 1000)
+        ]
+        if not batch:
+            return
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('foodgram', '0010_recipe_search_document'),
+        ('users', '0003_user_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Записи ленты',
+            },
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_timelines',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Разослан в ленты подписчиков'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('in_timelines', False)), fields=['author', '-pub_date'], name='recipe_not_in_timelines_idx'),
+        ),
+        migrations.AddField(
+            model_name='timelineentry',
+            name='author',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор'),
+        ),
+        migrations.AddField(
+            model_name='timelineentry',
+            name='recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='foodgram.recipe', verbose_name='Рецепт'),
+        ),
+        migrations.AddField(
+            model_name='timelineentry',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', '-pub_date', '-recipe'], name='timeline_user_pub_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_timeline_recipe'),
+        ),
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
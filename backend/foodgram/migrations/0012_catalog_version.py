@@ -0,0 +1,31 @@
+# Generated by Django 3.2.3 on 2026-10-18 03:13
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def create_version(apps, schema_editor):
+    apps.get_model('foodgram', 'CatalogVersion').objects.create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0011_recipe_timelines'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=0, verbose_name='Версия')),
+                ('modified', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Время изменения')),
+            ],
+            options={
+                'verbose_name': 'Версия каталога',
+                'verbose_name_plural': 'Версии каталога',
+            },
+        ),
+        migrations.RunPython(create_version, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 3.2.3 on 2026-10-18 03:14
+
+from django.db import migrations
+from django.db.models import Count, F, Min
+
+
+def merge_duplicates(apps, schema_editor):
+    Ingredient = apps.get_model('foodgram', 'Ingredient')
+    RecipeIngredients = apps.get_model('foodgram', 'RecipeIngredients')
+    ShoppingCartIngredient = apps.get_model(
+        'foodgram', 'ShoppingCartIngredient')
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(keep=Min('id'), total=Count('id')).filter(
+        total__gt=1).order_by()
+    for row in list(duplicates):
+        keep = row['keep']
+        ids = list(Ingredient.objects.filter(
+            name=row['name'], measurement_unit=row['measurement_unit']
+        ).exclude(pk=keep).values_list('id', flat=True))
+        RecipeIngredients.objects.filter(
+            ingredient__in=ids).update(ingredient=keep)
+        merged = list(ShoppingCartIngredient.objects.filter(
+            ingredient__in=ids).values_list('user', 'amount'))
+        ShoppingCartIngredient.objects.filter(ingredient__in=ids).delete()
+        for user_id, amount in merged:
+            if not ShoppingCartIngredient.objects.filter(
+                user=user_id, ingredient=keep
+            ).update(amount=F('amount') + amount):
+                ShoppingCartIngredient.objects.create(
+                    user_id=user_id, ingredient_id=keep, amount=amount)
+        Ingredient.objects.filter(pk__in=ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0012_catalog_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+    ]
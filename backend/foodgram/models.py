@@ -1,6 +1,18 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, RegexValidator
+from django.db.models import (BooleanField, Exists, F, OuterRef, Prefetch,
+                              Q, Sum, Value, Window)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from users.models import Subscribe
+from .counters import DenormalizedFieldsMixin
+from .search import (FTS_TABLE, FullTextField, index_recipes,
+                     search_recipes)
+from .storage import ContentHashStorage
 
 User = get_user_model()
 
@@ -13,6 +25,12 @@ class Ingredient(models.Model):
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
         ordering = ['name']
+        constraints = (
+            models.UniqueConstraint(
+                fields=('name', 'measurement_unit'),
+                name='unique_ingredient_name_unit'
+            ),
+        )
 
     def __str__(self):
         return self.name
@@ -41,7 +59,89 @@ class Tag(models.Model):
         return self.name
 
 
-class Recipe(models.Model):
+class CatalogVersionQuerySet(models.QuerySet):
+
+    def current(self):
+        return self.get_or_create(pk=1)[0]
+
+    def bump(self):
+        if not self.filter(pk=1).update(
+                version=F('version') + 1, modified=timezone.now()):
+            self.get_or_create(pk=1, defaults={'version': 1})
+
+
+class CatalogVersion(models.Model):
+    version = models.PositiveBigIntegerField('Версия', default=0)
+    modified = models.DateTimeField('Время изменения', default=timezone.now)
+
+    objects = CatalogVersionQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Версия каталога'
+        verbose_name_plural = 'Версии каталога'
+
+    def __str__(self):
+        return str(self.version)
+
+
+def recipe_prefetches():
+    return (
+        'tags',
+        Prefetch(
+            'ingredient_recipes',
+            queryset=RecipeIngredients.objects.select_related('ingredient')
+        ),
+    )
+
+
+class RecipeQuerySet(models.QuerySet):
+
+    def with_related(self):
+        return self.select_related('author').prefetch_related(
+            *recipe_prefetches())
+
+    def with_user_flags(self, user):
+        if user.is_anonymous:
+            false = Value(False, output_field=BooleanField())
+            return self.annotate(
+                is_favorited=false,
+                is_in_shopping_cart=false,
+                is_author_subscribed=false,
+            )
+        return self.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_author_subscribed=Exists(Subscribe.objects.filter(
+                user=user, following=OuterRef('author'))),
+        )
+
+    def search(self, query):
+        return search_recipes(self, query)
+
+    def update_search_index(self):
+        index_recipes(self)
+
+    def latest_per_author(self, authors, limit=None):
+        queryset = self.filter(author__in=authors)
+        if limit is None:
+            return queryset
+        windowed = queryset.order_by().annotate(
+            row_number=Window(
+                expression=RowNumber(),
+                partition_by=[F('author')],
+                order_by=F('pub_date').desc(),
+            )
+        ).values('pk', 'row_number')
+        sql, params = windowed.query.sql_with_params()
+        return self.filter(pk__in=RawSQL(
+            f'SELECT id FROM ({sql}) AS windowed WHERE row_number <= %s',
+            (*params, limit)
+        ))
+
+
+class Recipe(DenormalizedFieldsMixin, models.Model):
     name = models.CharField('Название', max_length=200)
     author = models.ForeignKey(
         User,
@@ -54,9 +154,16 @@ class Recipe(models.Model):
     image = models.ImageField(
         'Изображение',
         upload_to='recipes/',
+        storage=ContentHashStorage(),
         null=True,
         default=None
     )
+    image_variants = models.JSONField(
+        'Варианты изображения',
+        default=dict,
+        blank=True,
+        editable=False
+    )
     cooking_time = models.PositiveSmallIntegerField(
         'Время приготовления',
         validators=[MinValueValidator(1, message='Минимальное значение: 1')]
@@ -77,16 +184,66 @@ class Recipe(models.Model):
         auto_now_add=True,
         editable=False,
     )
+    favorites_count = models.IntegerField(
+        'Добавлений в избранное',
+        default=0,
+        editable=False
+    )
+    shopping_cart_count = models.IntegerField(
+        'Добавлений в список покупок',
+        default=0,
+        editable=False
+    )
+    search_vector = SearchVectorField(
+        'Поисковый вектор',
+        null=True,
+        editable=False
+    )
+    in_timelines = models.BooleanField(
+        'Разослан в ленты подписчиков',
+        default=False,
+        editable=False
+    )
+
+    objects = RecipeQuerySet.as_manager()
+
+    denormalized_fields = (
+        'favorites_count', 'shopping_cart_count', 'in_timelines')
 
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = (
+            models.Index(fields=('-pub_date', '-id'),
+                         name='recipe_pub_date_id_idx'),
+            models.Index(fields=('author', '-pub_date'),
+                         condition=Q(in_timelines=False),
+                         name='recipe_not_in_timelines_idx'),
+        )
 
     def __str__(self):
         return self.name
 
 
+class RecipeSearchDocument(models.Model):
+    recipe = models.OneToOneField(
+        Recipe,
+        primary_key=True,
+        db_column='rowid',
+        related_name='search_document',
+        on_delete=models.DO_NOTHING
+    )
+    name = models.TextField()
+    text = models.TextField()
+    document = FullTextField(db_column=FTS_TABLE)
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = FTS_TABLE
+
+
 class RecipeIngredients(models.Model):
     recipe = models.ForeignKey(
         to=Recipe,
@@ -138,6 +295,119 @@ class ShoppingCart(models.Model):
         return f'Рецепт {self.recipe} в списке покупок у {self.user}'
 
 
+class ShoppingCartIngredientQuerySet(models.QuerySet):
+
+    def apply(self, user_ids, amounts):
+        amounts = {
+            ingredient_id: amount
+            for ingredient_id, amount in amounts.items() if amount
+        }
+        if not amounts:
+            return
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        self.bulk_create([
+            self.model(user_id=user_id, ingredient_id=ingredient_id,
+                       amount=0)
+            for user_id in user_ids
+            for ingredient_id, amount in amounts.items() if amount > 0
+        ], ignore_conflicts=True)
+        for ingredient_id, amount in amounts.items():
+            self.filter(
+                user__in=user_ids, ingredient=ingredient_id
+            ).update(amount=F('amount') + amount)
+        self.filter(
+            user__in=user_ids, ingredient__in=amounts, amount__lte=0
+        ).delete()
+
+    def add_recipe(self, user_ids, recipe_id, sign=1):
+        self.apply(user_ids, {
+            ingredient_id: sign * amount
+            for ingredient_id, amount in RecipeIngredients.objects.filter(
+                recipe=recipe_id).values_list('ingredient_id', 'amount')
+        })
+
+    def remove_recipe(self, user_ids, recipe_id):
+        self.add_recipe(user_ids, recipe_id, sign=-1)
+
+    def add_ingredient(self, recipe_id, ingredient_id, amount):
+        self.apply(
+            ShoppingCart.objects.filter(
+                recipe=recipe_id).values_list('user_id', flat=True),
+            {ingredient_id: amount}
+        )
+
+    def expected_totals(self, user_ids=None):
+        if user_ids is None:
+            totals = RecipeIngredients.objects.filter(
+                recipe__in_shopping_list__isnull=False)
+        else:
+            totals = RecipeIngredients.objects.filter(
+                recipe__in_shopping_list__user__in=user_ids)
+        return {
+            (user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount in totals.values_list(
+                'recipe__in_shopping_list__user', 'ingredient'
+            ).annotate(Sum('amount')).order_by().iterator()
+        }
+
+    def stored_totals(self, user_ids=None):
+        stored = self.all()
+        if user_ids is not None:
+            stored = stored.filter(user__in=user_ids)
+        return {
+            (user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount in stored.values_list(
+                'user', 'ingredient', 'amount').iterator()
+        }
+
+    def rebuild(self, user_ids=None, batch_size=1000):
+        totals = self.expected_totals(user_ids)
+        stored = self.all()
+        if user_ids is not None:
+            stored = stored.filter(user__in=user_ids)
+        stored.delete()
+        self.bulk_create([
+            self.model(user_id=user_id, ingredient_id=ingredient_id,
+                       amount=amount)
+            for (user_id, ingredient_id), amount in totals.items()
+        ], batch_size=batch_size)
+        return len(totals)
+
+
+class ShoppingCartIngredient(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_ingredients',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_ingredients',
+        verbose_name='Ингредиент'
+    )
+    amount = models.IntegerField('Количество')
+
+    objects = ShoppingCartIngredientQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Ингредиент списка покупок'
+        verbose_name_plural = 'Ингредиенты списка покупок'
+
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_shopping_list_ingredient'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.ingredient}: {self.amount} у {self.user}'
+
+
 class Favorite(models.Model):
     user = models.ForeignKey(
         User,
@@ -165,3 +435,43 @@ class Favorite(models.Model):
 
     def __str__(self):
         return f'Рецепт {self.recipe} в избранном у {self.user}'
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Пользователь'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Рецепт'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_timeline_recipe'
+            ),
+        )
+        indexes = (
+            models.Index(fields=('user', '-pub_date', '-recipe'),
+                         name='timeline_user_pub_date_idx'),
+        )
+
+    def __str__(self):
+        return f'Рецепт {self.recipe} в ленте {self.user}'
@@ -0,0 +1,91 @@
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connections, models
+from django.db.models import F, FloatField, Q, Value
+
+FTS_TABLE = 'foodgram_recipe_fts'
+
+
+class FullTextField(models.TextField):
+    pass
+
+
+@FullTextField.register_lookup
+class Match(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', (*lhs_params, *rhs_params)
+
+
+def get_vendor(queryset):
+    return connections[queryset.db].vendor
+
+
+def recipe_search_vector():
+    return (
+        SearchVector('name', weight='A', config=settings.RECIPE_SEARCH_CONFIG)
+        + SearchVector('text', weight='B',
+                       config=settings.RECIPE_SEARCH_CONFIG)
+    )
+
+
+def index_recipes(queryset):
+    vendor = get_vendor(queryset)
+    if vendor == 'postgresql':
+        queryset.update(search_vector=recipe_search_vector())
+    elif vendor == 'sqlite':
+        rows = list(queryset.values_list('id', 'name', 'text'))
+        with connections[queryset.db].cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [(pk,) for pk, name, text in rows]
+            )
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, text) '
+                'VALUES (%s, %s, %s)',
+                rows
+            )
+
+
+def unindex_recipes(using, ids):
+    if connections[using].vendor != 'sqlite':
+        return
+    with connections[using].cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+            [(pk,) for pk in ids]
+        )
+
+
+def fts_match(query):
+    terms = re.findall(r'\w+', query.lower())
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search_recipes(queryset, query):
+    vendor = get_vendor(queryset)
+    if vendor == 'postgresql':
+        search_query = SearchQuery(
+            query, config=settings.RECIPE_SEARCH_CONFIG,
+            search_type='websearch'
+        )
+        queryset = queryset.filter(search_vector=search_query).annotate(
+            search_rank=SearchRank(F('search_vector'), search_query))
+    elif vendor == 'sqlite':
+        match = fts_match(query)
+        if not match:
+            return queryset.none()
+        queryset = queryset.filter(
+            search_document__document__match=match
+        ).annotate(search_rank=-F('search_document__rank'))
+    else:
+        queryset = queryset.filter(
+            Q(name__icontains=query) | Q(text__icontains=query)
+        ).annotate(search_rank=Value(0.0, output_field=FloatField()))
+    return queryset.order_by('-search_rank', '-pub_date', '-id')
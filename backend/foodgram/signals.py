@@ -0,0 +1,110 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from users.models import Subscribe
+from .counters import adjust
+from .models import (Favorite, Recipe, RecipeIngredients, ShoppingCart,
+                     ShoppingCartIngredient)
+from .search import unindex_recipes
+from .timelines import fan_out, follow, unfollow
+
+SEARCH_FIELDS = {'name', 'text'}
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Subscribe)
+def increment_counters(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        adjust(instance, 1)
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Subscribe)
+def decrement_counters(sender, instance, **kwargs):
+    adjust(instance, -1)
+
+
+@receiver(post_save, sender=Recipe)
+def index_recipe(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw or update_fields is not None and not SEARCH_FIELDS & set(
+            update_fields):
+        return
+    Recipe.objects.using(kwargs['using']).filter(
+        pk=instance.pk).update_search_index()
+
+
+@receiver(post_delete, sender=Recipe)
+def unindex_recipe(sender, instance, using, **kwargs):
+    unindex_recipes(using, [instance.pk])
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        fan_out(instance)
+
+
+@receiver(post_save, sender=Subscribe)
+def fill_timeline(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and instance.user_id and instance.following_id:
+        follow(instance.user_id, instance.following_id)
+
+
+@receiver(post_delete, sender=Subscribe)
+def clear_timeline(sender, instance, **kwargs):
+    unfollow(instance.user_id, instance.following_id)
+
+
+@receiver(pre_save, sender=ShoppingCart)
+@receiver(pre_save, sender=RecipeIngredients)
+def remember_previous(sender, instance, raw=False, **kwargs):
+    instance.previous = None
+    if instance.pk is not None and not raw:
+        instance.previous = sender.objects.filter(
+            pk=instance.pk).values().first()
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_to_shopping_list(sender, instance, raw=False, **kwargs):
+    previous = getattr(instance, 'previous', None)
+    if raw or previous and (previous['user_id'], previous['recipe_id']) == (
+            instance.user_id, instance.recipe_id):
+        return
+    if previous:
+        ShoppingCartIngredient.objects.remove_recipe(
+            [previous['user_id']], previous['recipe_id'])
+    ShoppingCartIngredient.objects.add_recipe(
+        [instance.user_id], instance.recipe_id)
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def remove_from_shopping_list(sender, instance, **kwargs):
+    ShoppingCartIngredient.objects.remove_recipe(
+        [instance.user_id], instance.recipe_id)
+
+
+@receiver(post_save, sender=RecipeIngredients)
+def update_shopping_lists(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    amount = instance.amount
+    previous = getattr(instance, 'previous', None)
+    if previous and (previous['recipe_id'], previous['ingredient_id']) == (
+            instance.recipe_id, instance.ingredient_id):
+        amount -= previous['amount']
+    elif previous:
+        ShoppingCartIngredient.objects.add_ingredient(
+            previous['recipe_id'], previous['ingredient_id'],
+            -previous['amount'])
+    ShoppingCartIngredient.objects.add_ingredient(
+        instance.recipe_id, instance.ingredient_id, amount)
+
+
+@receiver(post_delete, sender=RecipeIngredients)
+def remove_from_shopping_lists(sender, instance, **kwargs):
+    ShoppingCartIngredient.objects.add_ingredient(
+        instance.recipe_id, instance.ingredient_id, -instance.amount)
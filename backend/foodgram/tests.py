@@ -0,0 +1,169 @@
+import io
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from users.models import Subscribe, User
+from .counters import find_drift
+from .importers import upsert_ingredients
+from .models import (CatalogVersion, Favorite, Ingredient, Recipe,
+                     RecipeIngredients, ShoppingCart, ShoppingCartIngredient)
+
+
+class ShoppingCartIngredientTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass')
+        cls.users = [
+            User.objects.create_user(
+                username=f'user{i}', email=f'user{i}@example.com',
+                password='pass')
+            for i in range(2)
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(name=f'Ингредиент {i}',
+                                      measurement_unit='г')
+            for i in range(3)
+        ]
+
+    def create_recipe(self, amounts, author=None):
+        recipe = Recipe.objects.create(
+            name='Рецепт', author=author or self.author, text='Текст',
+            cooking_time=1)
+        for ingredient, amount in zip(self.ingredients, amounts):
+            RecipeIngredients.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=amount)
+        return recipe
+
+    def assertTotalsConsistent(self):
+        self.assertEqual(ShoppingCartIngredient.objects.stored_totals(),
+                         ShoppingCartIngredient.objects.expected_totals())
+
+    def test_cart_add_and_remove(self):
+        first = self.create_recipe([1, 2])
+        second = self.create_recipe([3, 4, 5])
+        for user in self.users:
+            ShoppingCart.objects.create(user=user, recipe=first)
+        ShoppingCart.objects.create(user=self.users[0], recipe=second)
+        self.assertTotalsConsistent()
+        self.assertEqual(ShoppingCartIngredient.objects.get(
+            user=self.users[0], ingredient=self.ingredients[0]).amount, 4)
+        ShoppingCart.objects.filter(recipe=first).delete()
+        self.assertTotalsConsistent()
+
+    def test_recipe_ingredients_change(self):
+        recipe = self.create_recipe([1, 2])
+        ShoppingCart.objects.create(user=self.users[0], recipe=recipe)
+        row = recipe.ingredient_recipes.get(ingredient=self.ingredients[0])
+        row.amount = 10
+        row.save()
+        self.assertTotalsConsistent()
+        row.ingredient = self.ingredients[2]
+        row.save()
+        self.assertTotalsConsistent()
+        RecipeIngredients.objects.create(
+            recipe=recipe, ingredient=self.ingredients[0], amount=7)
+        recipe.ingredient_recipes.filter(
+            ingredient=self.ingredients[1]).delete()
+        self.assertTotalsConsistent()
+
+    def test_recipe_delete(self):
+        recipe = self.create_recipe([1, 2, 3])
+        other = self.create_recipe([4])
+        for user in self.users:
+            ShoppingCart.objects.create(user=user, recipe=recipe)
+            ShoppingCart.objects.create(user=user, recipe=other)
+        Recipe.objects.filter(pk=recipe.pk).delete()
+        self.assertTotalsConsistent()
+
+    def test_author_delete(self):
+        author = User.objects.create_user(
+            username='other', email='other@example.com', password='pass')
+        recipe = self.create_recipe([1, 2], author=author)
+        ShoppingCart.objects.create(user=self.users[0], recipe=recipe)
+        ShoppingCart.objects.create(user=author, recipe=recipe)
+        author.delete()
+        self.assertTotalsConsistent()
+        self.assertFalse(ShoppingCartIngredient.objects.exists())
+
+    def test_apply_with_existing_rows(self):
+        recipe = self.create_recipe([1, 2])
+        ShoppingCart.objects.create(user=self.users[0], recipe=recipe)
+        ShoppingCartIngredient.objects.apply(
+            [self.users[0].id], {self.ingredients[0].id: 5})
+        self.assertEqual(ShoppingCartIngredient.objects.get(
+            user=self.users[0], ingredient=self.ingredients[0]).amount, 6)
+
+
+class CounterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass')
+        cls.user = User.objects.create_user(
+            username='user', email='user@example.com', password='pass')
+        cls.recipe = Recipe.objects.create(
+            name='Рецепт', author=cls.author, text='Текст', cooking_time=1)
+
+    def test_stale_recipe_save_keeps_counters(self):
+        stale = Recipe.objects.get(pk=self.recipe.pk)
+        Favorite.objects.create(user=self.user, recipe=self.recipe)
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipe)
+        stale.name = 'Новое название'
+        stale.save()
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        self.assertEqual(recipe.name, 'Новое название')
+        self.assertEqual(
+            (recipe.favorites_count, recipe.shopping_cart_count), (1, 1))
+        self.assertEqual(list(find_drift()), [])
+
+    def test_stale_user_save_keeps_counters(self):
+        stale = User.objects.get(pk=self.author.pk)
+        Subscribe.objects.create(user=self.user, following=self.author)
+        Recipe.objects.create(
+            name='Второй', author=self.author, text='Текст', cooking_time=1)
+        stale.first_name = 'Имя'
+        stale.save()
+        author = User.objects.get(pk=self.author.pk)
+        self.assertEqual(author.first_name, 'Имя')
+        self.assertEqual(
+            (author.recipes_count, author.followers_count), (2, 1))
+        self.assertEqual(list(find_drift()), [])
+
+
+class ImportIngredientsTests(TestCase):
+
+    def import_file(self, content, extension='csv'):
+        with tempfile.NamedTemporaryFile(
+                'w', suffix=f'.{extension}', delete=False,
+                encoding='utf-8') as file:
+            file.write(content)
+        self.addCleanup(os.remove, file.name)
+        call_command('import_ingredients', file.name, batch_size=2,
+                     stdout=io.StringIO(), stderr=io.StringIO())
+
+    def test_upsert_skips_existing_and_repeated_rows(self):
+        Ingredient.objects.create(name='соль', measurement_unit='г')
+        created = upsert_ingredients([
+            ('соль', 'г'), ('соль', 'кг'), ('соль', 'кг'), ('сахар', 'г')])
+        self.assertEqual(created, 2)
+        self.assertEqual(upsert_ingredients([('сахар', 'г')]), 0)
+        self.assertEqual(Ingredient.objects.count(), 3)
+
+    def test_repeated_import_is_idempotent(self):
+        content = 'name,measurement_unit\nсоль,г\nсахар,г\nсоль,г\nмука,кг\n'
+        version = CatalogVersion.objects.current().version
+        self.import_file(content)
+        self.assertEqual(
+            sorted(Ingredient.objects.values_list('name', flat=True)),
+            ['мука', 'сахар', 'соль'])
+        self.assertGreater(CatalogVersion.objects.current().version, version)
+        self.import_file(
+            '[{"name": "соль", "measurement_unit": "г"}, '
+            '{"name": "перец", "measurement_unit": "г"}]', 'json')
+        self.assertEqual(Ingredient.objects.count(), 4)
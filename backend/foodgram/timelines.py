@@ -0,0 +1,96 @@
+import heapq
+from itertools import islice
+
+from django.apps import apps as global_apps
+from django.conf import settings
+from django.db.models import Q
+
+
+def write_entries(entries, apps=global_apps, batch_size=1000):
+    TimelineEntry = apps.get_model('foodgram', 'TimelineEntry')
+    written = 0
+    entries = iter(entries)
+    while True:
+        batch = [
+            TimelineEntry(user_id=user_id, author_id=author_id,
+                          recipe_id=recipe_id, pub_date=pub_date)
+            for user_id, author_id, recipe_id, pub_date
+            in islice(entries, batch_size)
+        ]
+        if not batch:
+            return written
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+        written += len(batch)
+
+
+def fan_out(recipe):
+    User = global_apps.get_model('users', 'User')
+    if recipe.author_id is None or not User.objects.filter(
+        pk=recipe.author_id,
+        followers_count__lte=settings.FEED_FANOUT_MAX_FOLLOWERS,
+    ).exists():
+        return
+    Subscribe = global_apps.get_model('users', 'Subscribe')
+    followers = Subscribe.objects.filter(
+        following=recipe.author_id, user__isnull=False
+    ).values_list('user', flat=True)
+    write_entries(
+        (user_id, recipe.author_id, recipe.id, recipe.pub_date)
+        for user_id in followers.iterator()
+    )
+    global_apps.get_model('foodgram', 'Recipe').objects.filter(
+        pk=recipe.pk).update(in_timelines=True)
+    recipe.in_timelines = True
+
+
+def follow(user_id, author_id):
+    Recipe = global_apps.get_model('foodgram', 'Recipe')
+    write_entries(
+        (user_id, author_id, recipe_id, pub_date)
+        for recipe_id, pub_date in Recipe.objects.filter(
+            author=author_id, in_timelines=True
+        ).values_list('id', 'pub_date').iterator()
+    )
+
+
+def unfollow(user_id, author_id):
+    global_apps.get_model('foodgram', 'TimelineEntry').objects.filter(
+        user=user_id, author=author_id).delete()
+
+
+def before(position, recipe_field):
+    pub_date, recipe_id = position
+    return Q(pub_date__lt=pub_date) | Q(
+        pub_date=pub_date, **{f'{recipe_field}__lt': recipe_id})
+
+
+def read(user_id, position=None, limit=None):
+    TimelineEntry = global_apps.get_model('foodgram', 'TimelineEntry')
+    Recipe = global_apps.get_model('foodgram', 'Recipe')
+    entries = TimelineEntry.objects.filter(user=user_id)
+    pending = Recipe.objects.filter(
+        in_timelines=False, author__following__user=user_id)
+    if position is not None:
+        entries = entries.filter(before(position, 'recipe'))
+        pending = pending.filter(before(position, 'id'))
+    entries = entries.order_by('-pub_date', '-recipe').values_list(
+        'pub_date', 'recipe')[:limit]
+    pending = pending.order_by('-pub_date', '-id').values_list(
+        'pub_date', 'id')[:limit]
+    return list(islice(heapq.merge(entries, pending, reverse=True), limit))
+
+
+def rebuild(apps=global_apps, batch_size=1000):
+    Recipe = apps.get_model('foodgram', 'Recipe')
+    Subscribe = apps.get_model('users', 'Subscribe')
+    fanned_out = Q(
+        author__followers_count__lte=settings.FEED_FANOUT_MAX_FOLLOWERS)
+    Recipe.objects.exclude(fanned_out).update(in_timelines=False)
+    Recipe.objects.filter(fanned_out).update(in_timelines=True)
+    apps.get_model('foodgram', 'TimelineEntry').objects.all().delete()
+    return write_entries(Subscribe.objects.filter(
+        user__isnull=False, following__recipes__in_timelines=True
+    ).values_list(
+        'user', 'following', 'following__recipes',
+        'following__recipes__pub_date'
+    ).iterator(), apps, batch_size)
@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'django_filters',
@@ -49,6 +50,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
+    'api.db_routers.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -84,15 +87,65 @@ WSGI_APPLICATION = 'foodgram_backend.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': os.getenv('DB_ENGINE', 'django.db.backends.postgresql'),
         'NAME': os.getenv('POSTGRES_DB', 'django'),
         'USER': os.getenv('POSTGRES_USER', 'django'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', ''),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
     }
 }
 
+DB_REPLICAS = [
+    replica.strip()
+    for replica in os.getenv('DB_REPLICAS', '').split(',') if replica.strip()
+]
+
+DATABASES.update({
+    f'replica{index}': {
+        **DATABASES['default'],
+        ('NAME' if DATABASES['default']['ENGINE'].endswith('sqlite3')
+         else 'HOST'): replica,
+        'TEST': {'MIRROR': 'default'},
+    }
+    for index, replica in enumerate(DB_REPLICAS)
+})
+
+DATABASE_REPLICAS = [f'replica{index}' for index in range(len(DB_REPLICAS))]
+
+DATABASE_ROUTERS = ['api.db_routers.ReplicaRouter']
+
+REPLICA_STICKY_SECONDS = 5
+
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', '') == '1'
+
+ASYNC_DB_WORKERS = int(os.getenv('ASYNC_DB_WORKERS', 8))
+
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'foodgram'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+    'auth_tokens': {
+        'BACKEND': os.getenv(
+            'AUTH_TOKEN_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('AUTH_TOKEN_CACHE_LOCATION', 'auth_tokens'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,
+        },
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -146,7 +199,7 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ],
 
@@ -158,6 +211,73 @@ REST_FRAMEWORK = {
 
 }
 
+SUBSCRIPTION_RECIPES_LIMIT = 3
+
+RECIPE_SEARCH_CONFIG = 'russian'
+
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+METRICS_LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+
+METRICS_SIZE_BUCKETS = (
+    256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304,
+)
+
+METRICS_QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+METRICS_SLOW_REQUEST_MS = (
+    float(os.getenv('METRICS_SLOW_REQUEST_MS'))
+    if os.getenv('METRICS_SLOW_REQUEST_MS') else None
+)
+
+METRICS_SLOW_REQUEST_SQL_LIMIT = 20
+
+RECIPE_CACHE_ALIAS = 'default'
+
+RECIPE_CACHE_TIMEOUT = 60 * 60
+
+RECIPE_CACHE_CLOCK_SKEW = 1
+
+CATALOG_CACHE_TIMEOUT = 300
+
+CATALOG_VERSION_TIMEOUT = 10
+
+AUTH_TOKEN_CACHE_ALIAS = 'auth_tokens'
+
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.getenv('AUTH_TOKEN_CACHE_TIMEOUT', 10))
+
+FEED_FANOUT_MAX_FOLLOWERS = int(os.getenv('FEED_FANOUT_MAX_FOLLOWERS', 1000))
+
+CATALOG_CACHE_MAX_AGE = 60
+
+INGREDIENT_SEARCH_LIMIT = 50
+
+INGREDIENT_FUZZY_THRESHOLD = 0.3
+
+INGREDIENT_FUZZY_MAX_CANDIDATES = 5000
+
+RECIPE_IMAGE_MAX_SIZE = 10 * 1024 * 1024
+
+DATA_UPLOAD_MAX_MEMORY_SIZE = RECIPE_IMAGE_MAX_SIZE * 4 // 3 + 1024 * 1024
+
+RECIPE_IMAGE_VARIANTS = {
+    'thumbnail': (480, 480),
+    'detail': (1280, 1280),
+}
+
+RECIPE_IMAGE_QUALITY = 82
+
+RECIPE_IMAGE_ASYNC = True
+
+RECIPE_IMAGE_WORKERS = 2
+
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
 DJOSER = {
     'LOGIN_FIELD': 'email',
     'SERIALIZERS': {
@@ -2,8 +2,10 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import RegexValidator
 
+from foodgram.counters import DenormalizedFieldsMixin
 
-class User(AbstractUser):
+
+class User(DenormalizedFieldsMixin, AbstractUser):
 
     username = models.CharField(
         verbose_name='Имя пользователя',
@@ -35,6 +37,18 @@ class User(AbstractUser):
         verbose_name="Пароль",
         max_length=150,
     )
+    recipes_count = models.IntegerField(
+        verbose_name='Количество рецептов',
+        default=0,
+        editable=False,
+    )
+    followers_count = models.IntegerField(
+        verbose_name='Количество подписчиков',
+        default=0,
+        editable=False,
+    )
+
+    denormalized_fields = ('recipes_count', 'followers_count')
 
     class Meta:
         ordering = ['id']